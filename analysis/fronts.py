@@ -0,0 +1,57 @@
+#!/usr/bin/python
+"""
+A module to find the per-benchmark Pareto fronts of a results store.
+
+The store is scanned in chunks; each chunk is merged with the fronts found so
+    far and filtered with a vectorised non-dominated check, so that only the
+    fronts are kept in memory.
+"""
+
+import numpy as np
+
+from analysis import store
+from base import gem5_constants
+from base import gem5_pareto
+
+def pareto_fronts(columns, meta, objectives=gem5_constants._CONST_TARGET_CHOICES_SIMULATOR,
+                  chunk_rows=store._DEFAULT_CHUNK_ROWS):
+    """Finds the Pareto optimal rows of each benchmark, all objectives minimised
+
+    Args:
+        columns: memory-mapped columns of a results store
+        meta: results store metadata
+        objectives: objective columns
+        chunk_rows: number of rows processed at once
+
+    Returns:
+        fronts: a dict mapping benchmark names to sorted row indices of the
+            non-dominated successful simulations
+    """
+
+    bench_names = store.categories(meta, store._CONST_BENCHMARK)
+
+    front_rows = dict((b_idx, np.empty(0, dtype=np.int64)) for b_idx in range(len(bench_names)))
+    front_points = dict((b_idx, np.empty((0, len(objectives)))) for b_idx in range(len(bench_names)))
+
+    for start, stop in store.iter_chunks(meta['nrows'], chunk_rows):
+        codes = np.asarray(columns[store._CONST_BENCHMARK][start:stop])
+        points = np.column_stack([np.asarray(columns[o][start:stop]) for o in objectives])
+
+        valid = store.success_mask(columns, start, stop) & np.all(np.isfinite(points), axis=1)
+        rows = np.arange(start, stop)
+
+        for b_idx in np.unique(codes[valid]):
+            if b_idx < 0:
+                continue
+
+            in_bench = valid & (codes == b_idx)
+
+            cand_rows = np.concatenate([front_rows[b_idx], rows[in_bench]])
+            cand_points = np.concatenate([front_points[b_idx], points[in_bench]])
+
+            mask = gem5_pareto.pareto_mask(cand_points)
+
+            front_rows[b_idx] = cand_rows[mask]
+            front_points[b_idx] = cand_points[mask]
+
+    return dict((bench_names[b_idx], np.sort(r)) for b_idx, r in front_rows.items() if len(r) > 0)
@@ -0,0 +1,137 @@
+#!/usr/bin/python
+"""
+A script to produce analysis reports of simulation results headlessly.
+
+Usage:
+    python -m analysis.report ingest STORE_DIR aes_aes_results.csv [...]
+    python -m analysis.report report STORE_DIR OUTPUT_DIR
+"""
+
+import argparse
+import csv
+import os
+
+import numpy as np
+
+from analysis import fronts
+from analysis import store
+from analysis import summary
+from base import gem5_constants
+
+_SUMMARY_FILE = 'summary.csv'
+_SENSITIVITY_FILE = 'sensitivity.csv'
+_PARETO_FILE = 'pareto_front.csv'
+
+_SUMMARY_HEAD = ['benchmark', 'target', 'count', 'mean', 'std', 'min', 'max']
+_SENSITIVITY_HEAD = ['benchmark', 'target', 'parameter', 'effect_range', 'sobol_first_order',
+                     'levels', 'level_means']
+
+def _write_dicts(file_name, head, rows):
+    """Writes a list of dicts to a csv file"""
+
+    with open(file_name, 'w') as f:
+        writer = csv.writer(f)
+        writer.writerow(head)
+
+        for row in rows:
+            writer.writerow([' '.join(str(v) for v in row[h]) if isinstance(row[h], list)
+                             else row[h] for h in head])
+
+def _write_rows(file_name, columns, meta, bench_rows):
+    """Writes store rows to a csv file, decoding string columns"""
+
+    names = list(meta['columns'].keys())
+
+    with open(file_name, 'w') as f:
+        writer = csv.writer(f)
+        writer.writerow(names)
+
+        for rows in bench_rows.values():
+            values = []
+            for name in names:
+                col = np.asarray(columns[name][rows])
+                cats = meta['columns'][name]['categories']
+                if cats is not None:
+                    col = [cats[c] if c >= 0 else '' for c in col]
+                values.append(col)
+
+            for row in zip(*values):
+                writer.writerow(row)
+
+def ingest(store_dir, csv_paths, chunk_rows=store._DEFAULT_CHUNK_ROWS):
+    """Appends results files to a store
+
+    Args:
+        store_dir: store directory
+        csv_paths: a list of results files
+        chunk_rows: number of rows parsed at once
+    """
+
+    for csv_path in csv_paths:
+        nrows = store.ingest_csv(csv_path, store_dir, chunk_rows=chunk_rows)
+
+        print("Ingested {} rows from {}".format(nrows, csv_path))
+
+def report(store_dir, output_dir, targets=gem5_constants._CONST_TARGET_CHOICES_SIMULATOR,
+           chunk_rows=store._DEFAULT_CHUNK_ROWS):
+    """Writes summary statistics, sensitivities and Pareto fronts of a store
+
+    Args:
+        store_dir: store directory
+        output_dir: directory for the report files
+        targets: target columns, also the objectives of the Pareto fronts
+        chunk_rows: number of rows processed at once
+    """
+
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+
+    columns, meta = store.load_store(store_dir)
+
+    print("Total number of rows: {}".format(meta['nrows']))
+
+    stats = summary.summarise(columns, meta, targets, chunk_rows)
+    _write_dicts(os.path.join(output_dir, _SUMMARY_FILE), _SUMMARY_HEAD, stats)
+
+    for s in stats:
+        print("{benchmark:>20} {target:>8} n={count} mean={mean:.6g} std={std:.6g}"
+              " min={min:.6g} max={max:.6g}".format(**s))
+
+    effects = summary.main_effects(columns, meta, targets=targets, chunk_rows=chunk_rows)
+    _write_dicts(os.path.join(output_dir, _SENSITIVITY_FILE), _SENSITIVITY_HEAD, effects)
+
+    bench_fronts = fronts.pareto_fronts(columns, meta, targets, chunk_rows)
+    _write_rows(os.path.join(output_dir, _PARETO_FILE), columns, meta, bench_fronts)
+
+    for bench_name, rows in bench_fronts.items():
+        print("{:>20} Pareto front size: {}".format(bench_name, len(rows)))
+
+if __name__ == "__main__":
+
+    # Setting up the argument parser
+    parser = argparse.ArgumentParser(description='Analyse gem5-aladdin results')
+    parser.add_argument('--chunk_rows', type=int, default=store._DEFAULT_CHUNK_ROWS,
+                        help='Number of rows processed at once.')
+
+    subparsers = parser.add_subparsers(dest='command')
+
+    ingest_parser = subparsers.add_parser('ingest', help='Append results files to a store')
+    ingest_parser.add_argument('store_dir', type=str, help='Store directory')
+    ingest_parser.add_argument('csv_paths', type=str, nargs='+', help='Results files')
+
+    report_parser = subparsers.add_parser('report', help='Write analysis reports of a store')
+    report_parser.add_argument('store_dir', type=str, help='Store directory')
+    report_parser.add_argument('output_dir', type=str, help='Directory for the report files')
+    report_parser.add_argument('--targets', type=str, nargs='+',
+                               default=gem5_constants._CONST_TARGET_CHOICES_SIMULATOR,
+                               choices=gem5_constants._CONST_TARGET_CHOICES_SIMULATOR,
+                               help='Targets to be analysed.')
+
+    args = parser.parse_args()
+
+    if args.command == 'ingest':
+        ingest(args.store_dir, args.csv_paths, args.chunk_rows)
+    elif args.command == 'report':
+        report(args.store_dir, args.output_dir, args.targets, args.chunk_rows)
+    else:
+        parser.print_help()
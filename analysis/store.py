@@ -0,0 +1,259 @@
+#!/usr/bin/python
+"""
+A module to keep simulation results in a columnar store on disk.
+
+Each column is a raw binary file that is appended to on ingest and
+    memory-mapped on load, so that result corpora larger than the memory can be
+    analysed in chunks. String columns, e.g. the benchmark, are stored as integer
+    codes into a list of categories kept in the store metadata.
+"""
+
+import csv
+import json
+import os
+
+import numpy as np
+
+_META_FILE = 'meta.json'
+_COLUMN_EXT = '.bin'
+
+_CONST_BENCHMARK = 'benchmark'
+_CONST_SUCCESS = 'success'
+
+_NUMERIC_DTYPE = 'float64'
+_CATEGORY_DTYPE = 'int32'
+_MISSING_CODE = -1
+
+_RESULTS_FILE_SUFFIX = '_results.csv'
+
+# Default constants
+_DEFAULT_CHUNK_ROWS = 100000
+
+def _parse_numeric(value, is_flag=False):
+    """Parses a results file value as a number
+
+    Boolean flags, e.g. the success column, are stored as 1.0/0.0. Anything
+        else that is not a number, e.g. the False written for the results of
+        failed simulations, is stored as NaN.
+    """
+
+    value = value.strip()
+    lower = value.lower()
+
+    if lower in ('true', 'false'):
+        if is_flag:
+            return 1.0 if lower == 'true' else 0.0
+        return np.nan
+
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+def _is_numeric(values):
+    for value in values:
+        value = value.strip()
+        if value == '' or value.lower() in ('true', 'false'):
+            continue
+        try:
+            float(value)
+        except ValueError:
+            return False
+
+    return True
+
+def _load_meta(store_dir):
+    meta_path = os.path.join(store_dir, _META_FILE)
+
+    if not os.path.isfile(meta_path):
+        return {'nrows': 0, 'columns': {}}
+
+    with open(meta_path, 'r') as meta_file:
+        return json.load(meta_file)
+
+def _save_meta(store_dir, meta):
+    meta_path = os.path.join(store_dir, _META_FILE)
+    tmp_path = meta_path + '.tmp'
+
+    with open(tmp_path, 'w') as meta_file:
+        json.dump(meta, meta_file, indent=1)
+
+    os.rename(tmp_path, meta_path)
+
+def _column_path(store_dir, name):
+    return os.path.join(store_dir, name + _COLUMN_EXT)
+
+def _missing_values(col_meta, nrows):
+    if col_meta['categories'] is None:
+        return np.full(nrows, np.nan, dtype=_NUMERIC_DTYPE)
+
+    return np.full(nrows, _MISSING_CODE, dtype=_CATEGORY_DTYPE)
+
+def _truncate_columns(store_dir, meta):
+    """Drops rows left behind in the column files by an interrupted ingest"""
+
+    for name, col_meta in meta['columns'].items():
+        col_path = _column_path(store_dir, name)
+        size = meta['nrows'] * np.dtype(col_meta['dtype']).itemsize
+
+        if os.path.getsize(col_path) > size:
+            with open(col_path, 'r+b') as col_file:
+                col_file.truncate(size)
+
+def _append_chunk(store_dir, meta, header, rows):
+    """Appends a chunk of rows to every column of the store"""
+
+    columns = meta['columns']
+    nrows = meta['nrows']
+
+    for idx, name in enumerate(header):
+        if name in columns:
+            continue
+
+        if _is_numeric([row[idx] for row in rows]):
+            columns[name] = {'dtype': _NUMERIC_DTYPE, 'categories': None}
+        else:
+            columns[name] = {'dtype': _CATEGORY_DTYPE, 'categories': []}
+
+        # backfills rows ingested before the column appeared
+        with open(_column_path(store_dir, name), 'wb') as col_file:
+            _missing_values(columns[name], nrows).tofile(col_file)
+
+    header_idx = dict((name, idx) for idx, name in enumerate(header))
+
+    for name, col_meta in columns.items():
+
+        if name not in header_idx:
+            chunk = _missing_values(col_meta, len(rows))
+
+        elif col_meta['categories'] is None:
+            idx = header_idx[name]
+            is_flag = name == _CONST_SUCCESS
+            chunk = np.array([_parse_numeric(row[idx], is_flag) for row in rows],
+                             dtype=_NUMERIC_DTYPE)
+
+        else:
+            idx = header_idx[name]
+            categories = col_meta['categories']
+            codes = dict((c, i) for i, c in enumerate(categories))
+
+            chunk = np.empty(len(rows), dtype=_CATEGORY_DTYPE)
+            for i, row in enumerate(rows):
+                value = row[idx].strip()
+                if value not in codes:
+                    codes[value] = len(categories)
+                    categories.append(value)
+                chunk[i] = codes[value]
+
+        with open(_column_path(store_dir, name), 'ab') as col_file:
+            chunk.tofile(col_file)
+
+    meta['nrows'] = nrows + len(rows)
+
+def ingest_csv(csv_path, store_dir, benchmark=None, chunk_rows=_DEFAULT_CHUNK_ROWS):
+    """Appends a results file to the store
+
+    The file is streamed in chunks and the metadata is saved after each chunk,
+        rows of an interrupted ingest beyond the saved metadata are dropped.
+        Columns missing from the file are filled with NaN, new columns are
+        backfilled with NaN for the rows already stored.
+
+    Args:
+        csv_path: results file, e.g. written by sample_gem5_parameters.py
+        store_dir: store directory, created if it does not exist
+        benchmark: benchmark of the results if the file has no benchmark column,
+            by default taken from a '<benchmark>_results.csv' file name
+        chunk_rows: number of rows parsed at once
+
+    Returns:
+        nrows: number of rows appended
+    """
+
+    if not os.path.isdir(store_dir):
+        os.makedirs(store_dir)
+
+    if benchmark is None:
+        file_name = os.path.basename(csv_path)
+        if file_name.endswith(_RESULTS_FILE_SUFFIX):
+            benchmark = file_name[:-len(_RESULTS_FILE_SUFFIX)]
+        else:
+            benchmark = os.path.splitext(file_name)[0]
+
+    meta = _load_meta(store_dir)
+    _truncate_columns(store_dir, meta)
+
+    appended = 0
+    with open(csv_path, 'r') as csv_file:
+        reader = csv.reader(csv_file)
+
+        header = [h.strip() for h in next(reader)]
+
+        add_benchmark = _CONST_BENCHMARK not in header
+        if add_benchmark:
+            header.append(_CONST_BENCHMARK)
+
+        rows = []
+        for row in reader:
+            if not row:
+                continue
+
+            if add_benchmark:
+                row.append(benchmark)
+
+            rows.append(row)
+
+            if len(rows) == chunk_rows:
+                _append_chunk(store_dir, meta, header, rows)
+                _save_meta(store_dir, meta)
+                appended += len(rows)
+                rows = []
+
+        if rows:
+            _append_chunk(store_dir, meta, header, rows)
+            _save_meta(store_dir, meta)
+            appended += len(rows)
+
+    return appended
+
+def load_store(store_dir):
+    """Memory-maps the columns of the store
+
+    Args:
+        store_dir: store directory
+
+    Returns:
+        columns: a dict mapping column names to read-only memory-mapped vectors
+        meta: store metadata with the number of rows and the column categories
+    """
+
+    meta = _load_meta(store_dir)
+    nrows = meta['nrows']
+
+    columns = {}
+    for name, col_meta in meta['columns'].items():
+        if nrows == 0:
+            columns[name] = np.empty(0, dtype=col_meta['dtype'])
+        else:
+            columns[name] = np.memmap(_column_path(store_dir, name), dtype=col_meta['dtype'],
+                                      mode='r', shape=(nrows,))
+
+    return columns, meta
+
+def iter_chunks(nrows, chunk_rows=_DEFAULT_CHUNK_ROWS):
+    """Yields (start, stop) row ranges covering the store in chunks"""
+
+    for start in range(0, nrows, chunk_rows):
+        yield start, min(start + chunk_rows, nrows)
+
+def categories(meta, name):
+    """Returns the categories of a string column"""
+
+    return meta['columns'][name]['categories']
+
+def success_mask(columns, start, stop):
+    """Returns a mask of the rows of successful simulations in a row range"""
+
+    if _CONST_SUCCESS not in columns:
+        return np.ones(stop - start, dtype=bool)
+
+    return np.asarray(columns[_CONST_SUCCESS][start:stop]) == 1.0
@@ -0,0 +1,212 @@
+#!/usr/bin/python
+"""
+A module to compute per-benchmark statistics and parameter sensitivities.
+
+All statistics are accumulated chunk by chunk over the memory-mapped columns
+    of a results store, grouping rows by benchmark with np.bincount.
+"""
+
+import numpy as np
+
+from analysis import store
+from base import gem5_constants
+
+# Columns that are neither parameters nor targets
+_NON_PARAM_COLUMNS = [store._CONST_BENCHMARK, store._CONST_SUCCESS, 'run_time']
+
+# Parameters with more distinct values are binned for the main effects
+_MAX_LEVELS = 64
+
+def _benchmark_codes(columns, meta, start, stop):
+    codes = np.asarray(columns[store._CONST_BENCHMARK][start:stop])
+
+    return codes, len(store.categories(meta, store._CONST_BENCHMARK))
+
+def summarise(columns, meta, targets=gem5_constants._CONST_TARGET_CHOICES_SIMULATOR,
+              chunk_rows=store._DEFAULT_CHUNK_ROWS):
+    """Computes summary statistics of the targets per benchmark
+
+    Only successful simulations are taken into account.
+
+    Args:
+        columns: memory-mapped columns of a results store
+        meta: results store metadata
+        targets: target columns to be summarised
+        chunk_rows: number of rows processed at once
+
+    Returns:
+        summary: a list of dicts with benchmark, target, count, mean, std,
+            min and max
+    """
+
+    bench_names = store.categories(meta, store._CONST_BENCHMARK)
+    no_of_bench = len(bench_names)
+    targets = [t for t in targets if t in columns]
+
+    count = np.zeros((len(targets), no_of_bench))
+    total = np.zeros((len(targets), no_of_bench))
+    total_sq = np.zeros((len(targets), no_of_bench))
+    minimum = np.full((len(targets), no_of_bench), np.inf)
+    maximum = np.full((len(targets), no_of_bench), -np.inf)
+
+    for start, stop in store.iter_chunks(meta['nrows'], chunk_rows):
+        codes, _ = _benchmark_codes(columns, meta, start, stop)
+        success = store.success_mask(columns, start, stop) & (codes >= 0)
+
+        for t_idx, target in enumerate(targets):
+            values = np.asarray(columns[target][start:stop])
+            valid = success & np.isfinite(values)
+
+            b = codes[valid]
+            v = values[valid]
+
+            count[t_idx] += np.bincount(b, minlength=no_of_bench)
+            total[t_idx] += np.bincount(b, weights=v, minlength=no_of_bench)
+            total_sq[t_idx] += np.bincount(b, weights=v * v, minlength=no_of_bench)
+            np.minimum.at(minimum[t_idx], b, v)
+            np.maximum.at(maximum[t_idx], b, v)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        std = np.sqrt(np.maximum(total_sq / count - mean * mean, 0.0))
+
+    summary = []
+    for b_idx, bench_name in enumerate(bench_names):
+        for t_idx, target in enumerate(targets):
+            if count[t_idx, b_idx] == 0:
+                continue
+
+            summary.append({'benchmark': bench_name,
+                            'target': target,
+                            'count': int(count[t_idx, b_idx]),
+                            'mean': mean[t_idx, b_idx],
+                            'std': std[t_idx, b_idx],
+                            'min': minimum[t_idx, b_idx],
+                            'max': maximum[t_idx, b_idx]})
+
+    return summary
+
+def list_parameters(meta, targets=gem5_constants._CONST_TARGET_CHOICES_SIMULATOR):
+    """Lists the numeric columns of a results store that are parameters"""
+
+    return [name for name, col_meta in meta['columns'].items()
+            if col_meta['categories'] is None and name not in targets
+            and name not in _NON_PARAM_COLUMNS]
+
+def _parameter_levels(columns, meta, param, chunk_rows):
+    """Finds the distinct values of a parameter, or bin edges if there are too many"""
+
+    levels = np.empty(0)
+    lo = np.inf
+    hi = -np.inf
+    for start, stop in store.iter_chunks(meta['nrows'], chunk_rows):
+        values = np.asarray(columns[param][start:stop])
+        values = values[np.isfinite(values)]
+
+        if len(values) == 0:
+            continue
+
+        lo = min(lo, values.min())
+        hi = max(hi, values.max())
+
+        if levels is not None:
+            levels = np.union1d(levels, np.unique(values))
+            if len(levels) > _MAX_LEVELS:
+                levels = None
+
+    # bins span the range of the whole store
+    if levels is None:
+        return np.linspace(lo, hi, _MAX_LEVELS)
+
+    return levels
+
+def main_effects(columns, meta, params=None,
+                 targets=gem5_constants._CONST_TARGET_CHOICES_SIMULATOR,
+                 chunk_rows=store._DEFAULT_CHUNK_ROWS):
+    """Computes the main effects of the parameters on the targets per benchmark
+
+    The main effect of a parameter is the mean of a target at each parameter
+        level. The first-order Sobol index is estimated from the sample data as
+        the variance of these conditional means over the total variance.
+
+    Args:
+        columns: memory-mapped columns of a results store
+        meta: results store metadata
+        params: parameter columns, all numeric non-target columns by default
+        targets: target columns
+        chunk_rows: number of rows processed at once
+
+    Returns:
+        effects: a list of dicts with benchmark, target, parameter, the levels,
+            the mean at each level, the main effect range and the Sobol index
+    """
+
+    if params is None:
+        params = list_parameters(meta, targets)
+
+    bench_names = store.categories(meta, store._CONST_BENCHMARK)
+    no_of_bench = len(bench_names)
+    targets = [t for t in targets if t in columns]
+
+    effects = []
+    for param in params:
+        levels = _parameter_levels(columns, meta, param, chunk_rows)
+        no_of_levels = len(levels)
+
+        if no_of_levels < 2:
+            continue
+
+        # accumulated per (target, benchmark, level)
+        shape = (len(targets), no_of_bench * no_of_levels)
+        count = np.zeros(shape)
+        total = np.zeros(shape)
+        total_sq = np.zeros(shape)
+
+        for start, stop in store.iter_chunks(meta['nrows'], chunk_rows):
+            codes, _ = _benchmark_codes(columns, meta, start, stop)
+            x = np.asarray(columns[param][start:stop])
+            success = store.success_mask(columns, start, stop) & (codes >= 0) & np.isfinite(x)
+
+            level_idx = np.clip(np.searchsorted(levels, x, side='right') - 1, 0, no_of_levels - 1)
+            group = codes * no_of_levels + level_idx
+
+            for t_idx, target in enumerate(targets):
+                values = np.asarray(columns[target][start:stop])
+                valid = success & np.isfinite(values)
+
+                g = group[valid]
+                v = values[valid]
+
+                count[t_idx] += np.bincount(g, minlength=shape[1])
+                total[t_idx] += np.bincount(g, weights=v, minlength=shape[1])
+                total_sq[t_idx] += np.bincount(g, weights=v * v, minlength=shape[1])
+
+        count = count.reshape(len(targets), no_of_bench, no_of_levels)
+        total = total.reshape(count.shape)
+        total_sq = total_sq.reshape(count.shape)
+
+        n = count.sum(axis=2)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            level_mean = total / count
+            mean = total.sum(axis=2) / n
+            variance = total_sq.sum(axis=2) / n - mean * mean
+            between = np.nansum(count * (level_mean - mean[:, :, None]) ** 2, axis=2) / n
+            sobol = between / variance
+
+        for b_idx, bench_name in enumerate(bench_names):
+            for t_idx, target in enumerate(targets):
+                observed = count[t_idx, b_idx] > 0
+                if np.count_nonzero(observed) < 2:
+                    continue
+
+                means = level_mean[t_idx, b_idx][observed]
+
+                effects.append({'benchmark': bench_name,
+                                'target': target,
+                                'parameter': param,
+                                'levels': levels[observed].tolist(),
+                                'level_means': means.tolist(),
+                                'effect_range': means.max() - means.min(),
+                                'sobol_first_order': sobol[t_idx, b_idx]})
+
+    return effects
@@ -0,0 +1,255 @@
+#!/usr/bin/python
+"""
+A module to optimise acquisition functions over finite discrete design spaces.
+
+Design spaces made of categorical and discrete variables only, such as the
+    gem5-aladdin cache domains, are small enough to be enumerated. Every
+    candidate is scored in batches by the acquisition function, already
+    evaluated and pending designs are masked out, and the best candidates are
+    returned exactly, without continuous relaxation and rounding. Domains too
+    large to be enumerated can be restricted to a given set of candidates,
+    e.g. the recorded design points of a replayed corpus.
+"""
+
+import numpy as np
+
+_CONST_CATEGORICAL = 'categorical'
+_CONST_DISCRETE = 'discrete'
+
+# Default constants
+_DEFAULT_CHUNK_SIZE = 10000
+_DEFAULT_MAX_CANDIDATES = 10 ** 6
+
+def domain_shape(bds):
+    """Returns the number of values of each variable of a domain
+
+    Args:
+        bds: GPyOpt-style domain, a list of dicts with 'name', 'type' and 'domain'
+
+    Returns:
+        shape: a tuple with the number of values of each variable
+    """
+
+    for bd in bds:
+        if bd['type'] not in (_CONST_CATEGORICAL, _CONST_DISCRETE):
+            raise ValueError('Unsupported variable type: {}'.format(bd['type']))
+
+    return tuple(len(bd['domain']) for bd in bds)
+
+def domain_size(bds):
+    """Returns the number of designs of a domain"""
+
+    size = 1
+    for n in domain_shape(bds):
+        size *= n
+
+    return size
+
+def candidate_chunks(bds, chunk_size=_DEFAULT_CHUNK_SIZE, candidates=None):
+    """Enumerates every candidate of a domain in chunks
+
+    Args:
+        bds: GPyOpt-style domain
+        chunk_size: number of candidates per chunk
+        candidates: a matrix with the variable values of the candidates to be
+            enumerated instead of the whole domain
+
+    Yields:
+        flat_idx: flat indices of the candidates in the chunk
+        zipped: a matrix with the variable values of the candidates
+    """
+
+    if candidates is not None:
+        candidates = np.atleast_2d(np.asarray(candidates, dtype=np.float64))
+
+        for start in range(0, len(candidates), chunk_size):
+            zipped = candidates[start:start + chunk_size]
+
+            yield flat_index(zipped, bds), zipped
+
+        return
+
+    shape = domain_shape(bds)
+    levels = [np.asarray(bd['domain'], dtype=np.float64) for bd in bds]
+
+    size = domain_size(bds)
+    for start in range(0, size, chunk_size):
+        flat_idx = np.arange(start, min(start + chunk_size, size))
+        level_idx = np.unravel_index(flat_idx, shape)
+
+        zipped = np.column_stack([l[i] for l, i in zip(levels, level_idx)])
+
+        yield flat_idx, zipped
+
+def flat_index(zipped, bds):
+    """Maps candidates to their flat indices in the enumeration of a domain
+
+    Args:
+        zipped: a matrix with the variable values of the candidates
+        bds: GPyOpt-style domain
+
+    Returns:
+        flat_idx: flat indices, -1 for rows with values outside the domain
+    """
+
+    shape = domain_shape(bds)
+    zipped = np.atleast_2d(np.asarray(zipped, dtype=np.float64))
+
+    level_idx = []
+    valid = np.ones(len(zipped), dtype=bool)
+    for j, bd in enumerate(bds):
+        matches = zipped[:, j][:, None] == np.asarray(bd['domain'], dtype=np.float64)[None, :]
+
+        valid &= matches.any(axis=1)
+        level_idx.append(matches.argmax(axis=1))
+
+    flat_idx = np.ravel_multi_index(level_idx, shape)
+    flat_idx[~valid] = -1
+
+    return flat_idx
+
+def encode_candidates(zipped, bds):
+    """Encodes candidates into the model space
+
+    Categorical variables are one-hot encoded and discrete variables are kept
+        as they are, as GPyOpt does when it unzips inputs.
+
+    Args:
+        zipped: a matrix with the variable values of the candidates
+        bds: GPyOpt-style domain
+
+    Returns:
+        encoded: a matrix with the encoded candidates
+    """
+
+    columns = []
+    for j, bd in enumerate(bds):
+        if bd['type'] == _CONST_CATEGORICAL:
+            domain = np.asarray(bd['domain'], dtype=np.float64)
+            columns.append((zipped[:, j][:, None] == domain[None, :]).astype(np.float64))
+        else:
+            columns.append(zipped[:, j][:, None])
+
+    return np.hstack(columns)
+
+def top_k(f, bds, k=1, exclude=None, chunk_size=_DEFAULT_CHUNK_SIZE, encode=encode_candidates,
+          candidates=None):
+    """Finds the k candidates of a domain with the lowest acquisition values
+
+    Args:
+        f: acquisition function to be minimised, mapping a matrix of encoded
+            candidates to a vector or column of values
+        bds: GPyOpt-style domain
+        k: number of candidates to be returned
+        exclude: a matrix with the variable values of evaluated or pending
+            designs that must not be returned
+        chunk_size: number of candidates scored at once
+        encode: function encoding a chunk of candidates into the model space
+        candidates: a matrix with the variable values of the candidates to be
+            scored, every design of the domain by default
+
+    Returns:
+        zipped: a (k, d) matrix with the best candidates, best first
+        values: the acquisition values of the best candidates
+    """
+
+    excluded_idx = np.empty(0, dtype=np.int64)
+    if exclude is not None and len(exclude) > 0:
+        excluded_idx = flat_index(exclude, bds)
+
+    best_zipped = np.empty((0, len(bds)))
+    best_values = np.empty(0)
+
+    for flat_idx, zipped in candidate_chunks(bds, chunk_size, candidates):
+        values = np.asarray(f(encode(zipped, bds)), dtype=np.float64).reshape(-1)
+
+        keep = ~np.isin(flat_idx, excluded_idx) & ~np.isnan(values)
+
+        pool_zipped = np.vstack([best_zipped, zipped[keep]])
+        pool_values = np.concatenate([best_values, values[keep]])
+
+        if len(pool_values) > k:
+            sel = np.argpartition(pool_values, k - 1)[:k]
+            pool_zipped = pool_zipped[sel]
+            pool_values = pool_values[sel]
+
+        best_zipped = pool_zipped
+        best_values = pool_values
+
+    order = np.argsort(best_values, kind='stable')
+
+    return best_zipped[order], best_values[order]
+
+class ExhaustiveAcquisitionOptimizer(object):
+    """Drop-in replacement of the GPyOpt acquisition optimizer for discrete domains
+
+    Usage:
+        optimizer = BayesianOptimization(f=simulator, domain=_BDS, ...)
+        optimizer.acquisition.optimizer = ExhaustiveAcquisitionOptimizer(optimizer.space, _BDS)
+
+    Context variables are not supported.
+    """
+
+    def __init__(self, space, bds, chunk_size=_DEFAULT_CHUNK_SIZE, candidates=None,
+                 max_candidates=_DEFAULT_MAX_CANDIDATES):
+        """
+        Args:
+            space: GPyOpt design space of the optimisation
+            bds: GPyOpt-style domain the space was built from
+            chunk_size: number of candidates scored at once
+            candidates: a matrix with the variable values of the candidates to
+                be scored, every design of the domain by default
+            max_candidates: largest number of candidates scored per
+                optimisation, larger domains need explicit candidates
+        """
+
+        size = domain_size(bds) if candidates is None else len(candidates)
+        if size > max_candidates:
+            raise ValueError('{} candidates exceed the limit of {}'.format(size, max_candidates))
+
+        self.space = space
+        self.bds = bds
+        self.chunk_size = chunk_size
+        self.candidates = candidates
+        self.context_manager = None
+
+        # the vectorised encoding is used only if it matches the space's own
+        _, sample = next(candidate_chunks(bds, chunk_size=min(chunk_size, 100),
+                                          candidates=candidates))
+        unzipped = np.asarray(space.unzip_inputs(sample), dtype=np.float64)
+
+        if unzipped.shape == encode_candidates(sample, bds).shape and \
+                np.allclose(unzipped, encode_candidates(sample, bds)):
+            self.encode = encode_candidates
+        else:
+            self.encode = lambda zipped, _: np.asarray(space.unzip_inputs(zipped), dtype=np.float64)
+
+    def optimize(self, f=None, df=None, f_df=None, duplicate_manager=None):
+        """Finds the candidate minimising the acquisition function
+
+        Args:
+            f: acquisition function to be minimised
+            df: gradient of the acquisition function, unused
+            f_df: acquisition function and its gradient, used if f is not given
+            duplicate_manager: GPyOpt duplicate manager with the evaluated and
+                pending designs to be masked out
+
+        Returns:
+            x_min: the best candidate in the model space
+            fx_min: its acquisition value
+        """
+
+        if f is None:
+            f = lambda x: f_df(x)[0]
+
+        exclude = None
+        if duplicate_manager is not None:
+            exclude = np.array([list(p) for p in getattr(duplicate_manager, 'unique_points', [])])
+
+        zipped, values = top_k(f, self.bds, k=1, exclude=exclude, chunk_size=self.chunk_size,
+                               encode=self.encode, candidates=self.candidates)
+
+        if len(zipped) == 0:
+            raise ValueError('Every candidate design has been evaluated')
+
+        return self.encode(zipped, self.bds), np.atleast_2d(values)
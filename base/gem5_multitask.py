@@ -0,0 +1,226 @@
+#!/usr/bin/python
+"""
+A module with a multi-task surrogate sharing information across benchmarks.
+
+Results of previously studied MachSuite benchmarks are prior tasks of a
+    coregionalised GP (intrinsic coregionalisation model), whose task covariance
+    is learned jointly with the kernel over the parameters. The optimiser of a new
+    benchmark then starts from informed predictions instead of a flat prior.
+"""
+
+import csv
+
+import numpy as np
+
+import GPy
+from GPyOpt.models.base import BOModel
+
+from base import gem5_acquisition
+from base import gem5_constants
+from base import gem5_results
+
+_CONST_SUCCESS = 'success'
+
+# Noise variance used for exact evaluations
+_EXACT_FEVAL_NOISE = 1e-6
+
+# Bounds of the task-specific variances of the task covariance. Without a lower
+#   bound the covariance can collapse to rank one when few results of the new
+#   benchmark are known, which makes the predictions numerically unstable.
+_TASK_KAPPA_BOUNDS = (1e-2, 1e3)
+
+def load_task_data(results_file, bds, target, value_maps=None, params_func=None):
+    """Loads the results of a benchmark as a task of the multi-task surrogate
+
+    Args:
+        results_file: results file with a column for each variable of the
+            domain and the simulator targets, e.g. written by sample_gem5_parameters.py
+        bds: GPyOpt-style domain of the optimisation
+        target: a key value for the target function
+        value_maps: a dict mapping categorical variable names to dicts from domain
+            values to simulator parameter values, e.g. {'cache_size': _GEM5_DICT_CACHE_SIZE}
+        params_func: function mapping a dict of a result's parameter values, keyed
+            by column name, to a dict with the values of the domain variables,
+            for parameters stored in other units than the domain's
+
+    Returns:
+        X: a matrix with the results' design points encoded into the model space
+        Y: a column with the results' target values
+    """
+
+    if value_maps is None:
+        value_maps = {}
+
+    # simulator parameter values back to domain values
+    inverse_maps = dict((name, dict((float(v), k) for k, v in value_map.items()))
+                        for name, value_map in value_maps.items())
+
+    with open(results_file, 'r') as res_file:
+        reader = csv.reader(res_file)
+        header = [h.strip() for h in next(reader)]
+        rows = [row for row in reader if row]
+
+    head_idx = dict((h, i) for i, h in enumerate(header))
+
+    for bd in bds:
+        if bd['name'] not in head_idx:
+            raise ValueError('Results file lacks parameter {}'.format(bd['name']))
+
+    zipped = []
+    Y = []
+    for row in rows:
+        if _CONST_SUCCESS in head_idx and \
+                row[head_idx[_CONST_SUCCESS]].strip().lower() not in ('true', '1'):
+            continue
+
+        try:
+            params = dict((h, row[idx]) for h, idx in head_idx.items())
+            if params_func is not None:
+                params = params_func(params)
+
+            x = []
+            for bd in bds:
+                value = float(params[bd['name']])
+                if bd['type'] == 'categorical' and bd['name'] in inverse_maps:
+                    value = inverse_maps[bd['name']][value]
+                x.append(value)
+
+            results = dict((t, float(row[head_idx[t]]))
+                           for t in gem5_constants._CONST_TARGET_CHOICES_SIMULATOR)
+        except (KeyError, ValueError):
+            continue
+
+        zipped.append(x)
+        Y.append([gem5_results.get_target_value(results, target)])
+
+    zipped = np.array(zipped, dtype=np.float64).reshape(-1, len(bds))
+
+    # drops design points outside the domain
+    in_domain = gem5_acquisition.flat_index(zipped, bds) >= 0
+
+    X = gem5_acquisition.encode_candidates(zipped[in_domain], bds)
+
+    return X, np.array(Y, dtype=np.float64).reshape(-1, 1)[in_domain]
+
+class MultiTaskModel(BOModel):
+    """GPyOpt model of a new benchmark informed by the results of prior benchmarks
+
+    Usage:
+        model = MultiTaskModel([load_task_data(f, _BDS, _TARGET) for f in files])
+        optimizer = BayesianOptimization(f=simulator, domain=_BDS, model=model, ...)
+
+    Every task is standardised separately, so benchmarks of different scales
+        share only the shape of the response through the task covariance.
+    """
+
+    MCMC_sampler = False
+    analytical_gradient_prediction = False
+
+    def __init__(self, prior_tasks, kernel=None, W_rank=1, exact_feval=True, maximize=False,
+                 optimizer='bfgs', max_iters=1000, optimize_restarts=1, verbose=False):
+        """
+        Args:
+            prior_tasks: a list of (X, Y) pairs of prior benchmarks, with X
+                encoded into the model space
+            kernel: GPy kernel over the parameters, Matern52 with ARD by default
+            W_rank: rank of the learned task covariance
+            exact_feval: flag to fix the noise to a negligible value
+            maximize: flag set when the optimiser maximises, the prior targets are
+                then negated as GPyOpt does with the new benchmark's
+            optimizer: GPy optimizer of the hyperparameters
+            max_iters: maximum number of optimizer iterations
+            optimize_restarts: number of optimizer restarts
+            verbose: flag to print the optimizer output
+        """
+
+        sign = -1.0 if maximize else 1.0
+
+        self.prior_tasks = [(np.asarray(X, dtype=np.float64), sign * np.asarray(Y, dtype=np.float64))
+                            for X, Y in prior_tasks]
+        self.kernel = kernel
+        self.W_rank = W_rank
+        self.exact_feval = exact_feval
+        self.optimizer = optimizer
+        self.max_iters = max_iters
+        self.optimize_restarts = optimize_restarts
+        self.verbose = verbose
+
+        self.task = len(self.prior_tasks)
+        self.model = None
+
+    def _create_kernel(self, input_dim):
+        if self.kernel is None:
+            kernel = GPy.kern.Matern52(input_dim, variance=1., ARD=True)
+        else:
+            kernel = self.kernel.copy()
+
+        return GPy.util.multioutput.ICM(input_dim=input_dim, num_outputs=self.task + 1,
+                                        kernel=kernel, W_rank=self.W_rank)
+
+    def updateModel(self, X_all, Y_all, X_new, Y_new):
+        """Refits the surrogate to the prior tasks and the new benchmark's results"""
+
+        self._X = np.asarray(X_all, dtype=np.float64)
+
+        Y_all = np.asarray(Y_all, dtype=np.float64)
+        self._Y_mean = Y_all.mean()
+        self._Y_std = Y_all.std() if Y_all.std() > 0 else 1.0
+
+        X_list = [X for X, _ in self.prior_tasks] + [self._X]
+        Y_list = [(Y - Y.mean()) / (Y.std() if Y.std() > 0 else 1.0) for _, Y in self.prior_tasks]
+        Y_list.append((Y_all - self._Y_mean) / self._Y_std)
+
+        previous = self.model
+
+        self.model = GPy.models.GPCoregionalizedRegression(
+            X_list, Y_list, kernel=self._create_kernel(self._X.shape[1]))
+
+        if self.exact_feval:
+            self.model['.*Gaussian_noise.*variance'].constrain_fixed(_EXACT_FEVAL_NOISE, warning=False)
+
+        self.model['.*B.kappa'].constrain_bounded(*_TASK_KAPPA_BOUNDS, warning=False)
+
+        # warm start from the previous fit
+        if previous is not None:
+            self.model[:] = previous[:]
+
+        if self.max_iters > 0:
+            if self.optimize_restarts == 1:
+                self.model.optimize(optimizer=self.optimizer, max_iters=self.max_iters,
+                                    messages=False)
+            else:
+                self.model.optimize_restarts(num_restarts=self.optimize_restarts,
+                                             optimizer=self.optimizer, max_iters=self.max_iters,
+                                             verbose=self.verbose)
+
+    def predict(self, X):
+        """Predicts the mean and standard deviation of the new benchmark at X"""
+
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        task_idx = np.full((len(X), 1), self.task)
+
+        m, v = self.model.predict(np.hstack([X, task_idx]),
+                                  Y_metadata={'output_index': task_idx.astype(int)})
+
+        v = np.clip(v, 1e-10, np.inf)
+
+        return m * self._Y_std + self._Y_mean, np.sqrt(v) * self._Y_std
+
+    def get_fmin(self):
+        """Returns the lowest predicted value at the new benchmark's evaluated points"""
+
+        return self.predict(self._X)[0].min()
+
+    def task_covariance(self):
+        """Returns the learned covariance between the benchmarks, the new one last"""
+
+        coregion = self.model.kern.B
+        W = np.asarray(coregion.W)
+
+        return W.dot(W.T) + np.diag(np.asarray(coregion.kappa))
+
+    def get_model_parameters(self):
+        return np.atleast_2d(self.model[:])
+
+    def get_model_parameters_names(self):
+        return self.model.parameter_names_flat().tolist()
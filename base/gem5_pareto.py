@@ -0,0 +1,224 @@
+#!/usr/bin/python
+"""
+A module to find the Pareto optimal designs over the simulator targets.
+
+Provides a vectorised non-dominated filter and sorting for whole result sets,
+    hypervolume computation and an archive that tracks the front incrementally
+    as results arrive. All objectives are minimised, e.g. cycle, power and area.
+"""
+
+import numpy as np
+
+def pareto_mask(points, unique=True):
+    """Finds the non-dominated points of a set
+
+    Points are visited in order of their objective sum, so that each visited
+        point removes every remaining point it dominates in one vectorised step.
+
+    Args:
+        points: a (n, m) matrix with m objective values of n points
+        unique: flag to mark only one of duplicated points as non-dominated
+
+    Returns:
+        mask: a boolean vector, True for the non-dominated points
+    """
+
+    points = np.asarray(points, dtype=np.float64)
+    no_of_points = len(points)
+
+    # a point can only be dominated by points with a smaller or equal sum
+    order = np.argsort(points.sum(axis=1), kind='stable')
+
+    remaining = points[order]
+    efficient = np.arange(no_of_points)
+
+    i = 0
+    while i < len(remaining):
+        keep = np.any(remaining < remaining[i], axis=1)
+        if not unique:
+            keep |= np.all(remaining == remaining[i], axis=1)
+        keep[i] = True
+
+        efficient = efficient[keep]
+        remaining = remaining[keep]
+
+        i = np.count_nonzero(keep[:i]) + 1
+
+    mask = np.zeros(no_of_points, dtype=bool)
+    mask[order[efficient]] = True
+
+    return mask
+
+def non_dominated_sort(points):
+    """Sorts a set of points into successive non-dominated fronts
+
+    Args:
+        points: a (n, m) matrix with m objective values of n points
+
+    Returns:
+        ranks: a vector with the front of each point, 0 for the Pareto front
+    """
+
+    points = np.asarray(points, dtype=np.float64)
+
+    ranks = np.full(len(points), -1, dtype=np.int64)
+    remaining = np.arange(len(points))
+
+    rank = 0
+    while len(remaining) > 0:
+        mask = pareto_mask(points[remaining], unique=False)
+
+        ranks[remaining[mask]] = rank
+        remaining = remaining[~mask]
+
+        rank += 1
+
+    return ranks
+
+def _hypervolume_2d(points, ref_point):
+    """Computes the area dominated by points in two dimensions"""
+
+    order = np.argsort(points[:, 0], kind='stable')
+    xs = points[order, 0]
+    ys = np.minimum.accumulate(points[order, 1])
+
+    widths = np.diff(np.append(xs, ref_point[0]))
+
+    return np.sum(widths * (ref_point[1] - ys))
+
+def hypervolume(points, ref_point):
+    """Computes the hypervolume dominated by a set of points
+
+    The volume is sliced along the last objective and each slice is computed
+        recursively, down to the exact two dimensional sweep.
+
+    Args:
+        points: a (n, m) matrix with m objective values of n points
+        ref_point: a reference point dominated by the points of interest
+
+    Returns:
+        volume: the hypervolume bounded by the reference point
+    """
+
+    points = np.asarray(points, dtype=np.float64)
+    ref_point = np.asarray(ref_point, dtype=np.float64)
+
+    # only points dominating the reference point contribute
+    points = points[np.all(points < ref_point, axis=1)]
+
+    if len(points) == 0:
+        return 0.0
+
+    if points.shape[1] == 1:
+        return float(ref_point[0] - points[:, 0].min())
+
+    if points.shape[1] == 2:
+        return float(_hypervolume_2d(points, ref_point))
+
+    points = points[pareto_mask(points)]
+    points = points[np.argsort(points[:, -1], kind='stable')]
+
+    depths = np.diff(np.append(points[:, -1], ref_point[-1]))
+
+    volume = 0.0
+    for i, depth in enumerate(depths):
+        if depth > 0:
+            volume += depth * hypervolume(points[:i + 1, :-1], ref_point[:-1])
+
+    return volume
+
+class ParetoArchive(object):
+    """Pareto front tracked incrementally as results arrive
+
+    The front is kept sorted by the first objective. A new point can only be
+        dominated by front points with a smaller or equal first objective and can
+        only dominate those with a larger or equal one, so each insert checks the
+        two slices found by binary search with vectorised comparisons.
+
+    Attributes:
+        objectives: names of the objectives
+        evaluations: number of points offered to the archive
+        last_update: evaluation count at which the front last changed
+    """
+
+    def __init__(self, objectives=None):
+        """Creates an empty archive
+
+        Args:
+            objectives: names of the objectives, e.g. ['cycle', 'power', 'area'],
+                used to pick values from results dicts
+        """
+
+        self.objectives = objectives
+
+        self._points = None
+        self._payloads = []
+
+        self.evaluations = 0
+        self.last_update = 0
+
+    def __len__(self):
+        return len(self._payloads)
+
+    def add(self, point, payload=None):
+        """Offers a point to the archive
+
+        Args:
+            point: objective values, or a results dict if objectives are set
+            payload: an object kept with the point, e.g. its parameters
+
+        Returns:
+            True if the point joined the front
+        """
+
+        self.evaluations += 1
+
+        if isinstance(point, dict):
+            point = [point[o] for o in self.objectives]
+
+        point = np.asarray(point, dtype=np.float64)
+
+        if not np.all(np.isfinite(point)):
+            return False
+
+        if self._points is None:
+            self._points = np.empty((0, len(point)))
+
+        first = self._points[:, 0]
+
+        # dominated by, or equal to, a point on the front
+        hi = np.searchsorted(first, point[0], side='right')
+        if np.any(np.all(self._points[:hi] <= point, axis=1)):
+            return False
+
+        # removes the front points dominated by the new one
+        lo = np.searchsorted(first, point[0], side='left')
+        keep = np.ones(len(self._points), dtype=bool)
+        keep[lo:] = ~np.all(self._points[lo:] >= point, axis=1)
+
+        self._points = self._points[keep]
+        self._payloads = [p for p, k in zip(self._payloads, keep) if k]
+
+        pos = np.searchsorted(self._points[:, 0], point[0], side='right')
+        self._points = np.insert(self._points, pos, point, axis=0)
+        self._payloads.insert(pos, payload)
+
+        self.last_update = self.evaluations
+
+        return True
+
+    def front(self):
+        """Returns the points of the front and their payloads"""
+
+        if self._points is None:
+            return np.empty((0, 0)), []
+
+        return self._points.copy(), list(self._payloads)
+
+    def hypervolume(self, ref_point):
+        """Returns the hypervolume of the front bounded by ref_point"""
+
+        if self._points is None:
+            return 0.0
+
+        return hypervolume(self._points, ref_point)
@@ -0,0 +1,319 @@
+#!/usr/bin/python
+"""
+A module to coalesce duplicate gem5-aladdin simulation requests.
+
+Keeps a registry of pending and completed (benchmark, parameters) keys on disk,
+    shared by every driver (samplers, BO runs, pool workers) pointed at the same
+    registry directory. A request for a design point that is already in flight
+    waits on the running simulation's result instead of launching a second one,
+    and a request for a completed design point returns the recorded result.
+"""
+
+import errno
+import hashlib
+import json
+import os
+import socket
+import time
+import uuid
+
+# Registry location, can be shared between drivers via the environment
+_REGISTRY_DIR_ENV = 'BOAT_REGISTRY_DIR'
+_DEFAULT_REGISTRY_DIR = os.environ.get(_REGISTRY_DIR_ENV, 'gem5_registry')
+
+_PENDING_EXT = '.pending'
+_RESULT_EXT = '.json'
+
+# Default constants
+_DEFAULT_POLL_INTERVAL = 5.0
+# pending marks from any host older than this are taken over, simulations
+#   running longer than this may be duplicated
+_DEFAULT_MAX_PENDING_AGE = 24 * 3600
+
+def _to_builtin(value):
+    """Converts numpy scalars to plain python values so that keys are stable
+
+    Args:
+        value: a parameter value
+
+    Returns:
+        value: the same value as a python built-in type
+    """
+
+    if hasattr(value, 'item'):
+        value = value.item()
+
+    return value
+
+def make_key(sim_params, bench_name, sim_id=None):
+    """Builds the registry key of a design point
+
+    Args:
+        sim_params: parameters for the simulator
+        bench_name: benchmark to be run with the simulator
+        sim_id: identity of a simulator other than gem5-aladdin, e.g. a replay
+            of recorded results, None for gem5-aladdin
+
+    Returns:
+        key: a hex digest identifying the (simulator, benchmark, parameters) triple
+    """
+
+    design = {'benchmark': bench_name,
+              'params': dict((str(k), _to_builtin(v)) for k, v in sim_params.items())}
+
+    # gem5-aladdin keys are left as they were before simulators were told apart
+    if sim_id is not None:
+        design['simulator'] = sim_id
+
+    design_str = json.dumps(design, sort_keys=True)
+
+    return hashlib.sha1(design_str.encode('utf-8')).hexdigest()
+
+def _entry_path(registry_dir, key, ext):
+    return os.path.join(registry_dir, "{}{}".format(key, ext))
+
+def get_result(key, registry_dir=_DEFAULT_REGISTRY_DIR):
+    """Returns the recorded result of a completed design point
+
+    Args:
+        key: registry key of the design point
+        registry_dir: registry directory
+
+    Returns:
+        results: a dict mapping simulation results or None if the design point
+            has not been completed yet
+    """
+
+    result_path = _entry_path(registry_dir, key, _RESULT_EXT)
+
+    try:
+        with open(result_path, 'r') as res_file:
+            entry = json.load(res_file)
+    except (IOError, OSError, ValueError):
+        return None
+
+    return entry['results']
+
+def _store_result(key, sim_params, bench_name, results, registry_dir):
+    """Records the result of a completed design point atomically"""
+
+    entry = {'benchmark': bench_name,
+             'params': dict((str(k), _to_builtin(v)) for k, v in sim_params.items()),
+             'results': dict((str(k), _to_builtin(v)) for k, v in results.items())}
+
+    tmp_path = _entry_path(registry_dir, "{}.{}".format(key, str(uuid.uuid4())[:12]), '.tmp')
+
+    with open(tmp_path, 'w') as tmp_file:
+        json.dump(entry, tmp_file)
+
+    os.rename(tmp_path, _entry_path(registry_dir, key, _RESULT_EXT))
+
+def _claim(key, registry_dir):
+    """Marks a design point as pending
+
+    Returns:
+        True if this caller now owns the design point, False if another
+            caller has it in flight
+    """
+
+    pending_path = _entry_path(registry_dir, key, _PENDING_EXT)
+
+    try:
+        fd = os.open(pending_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except OSError as e:
+        if e.errno == errno.EEXIST:
+            return False
+        raise
+
+    owner = {'host': socket.gethostname(), 'pid': os.getpid(), 'time': time.time()}
+
+    with os.fdopen(fd, 'w') as pending_file:
+        json.dump(owner, pending_file)
+
+    return True
+
+def _release(key, registry_dir):
+    """Removes the pending mark of a design point"""
+
+    try:
+        os.remove(_entry_path(registry_dir, key, _PENDING_EXT))
+    except OSError:
+        pass
+
+def _read_owner(key, registry_dir):
+    """Reads the owner of a pending mark
+
+    Returns:
+        owner: a dict with the host, pid and time of the owner or None if there
+            is no mark or the owner has not finished writing it yet
+    """
+
+    pending_path = _entry_path(registry_dir, key, _PENDING_EXT)
+
+    try:
+        with open(pending_path, 'r') as pending_file:
+            return json.load(pending_file)
+    except (IOError, OSError, ValueError):
+        return None
+
+def _is_stale(owner, max_pending_age=None):
+    """Checks whether a pending mark was left behind by a dead process
+
+    Marks created on this host are stale once their process is gone. Marks
+        from other hosts cannot be checked and are trusted until they are older
+        than max_pending_age.
+
+    Args:
+        owner: owner of the mark, as returned by _read_owner()
+        max_pending_age: seconds after which any mark is stale, None to trust
+            marks from other hosts forever
+    """
+
+    if owner is None:
+        return False
+
+    if max_pending_age is not None and time.time() - owner.get('time', 0.0) > max_pending_age:
+        return True
+
+    if owner.get('host') != socket.gethostname():
+        return False
+
+    try:
+        os.kill(owner['pid'], 0)
+    except OSError as e:
+        return e.errno == errno.ESRCH
+
+    return False
+
+def _remove_stale(key, registry_dir, owner):
+    """Removes a stale pending mark only if it still belongs to the given owner
+
+    The mark is first moved to a unique name, so that concurrent callers never
+        remove a mark they did not inspect. A fresh mark moved by mistake is
+        put back unless yet another caller has claimed the design point.
+    """
+
+    pending_path = _entry_path(registry_dir, key, _PENDING_EXT)
+    stale_path = _entry_path(registry_dir, "{}.{}".format(key, str(uuid.uuid4())[:12]), '.stale')
+
+    try:
+        os.rename(pending_path, stale_path)
+    except OSError:
+        # removed by the owner or another caller
+        return
+
+    try:
+        with open(stale_path, 'r') as stale_file:
+            moved_owner = json.load(stale_file)
+    except (IOError, OSError, ValueError):
+        moved_owner = None
+
+    if moved_owner != owner:
+        # a fresh claim, restored without overwriting a newer one
+        try:
+            os.link(stale_path, pending_path)
+        except OSError:
+            pass
+
+    try:
+        os.remove(stale_path)
+    except OSError:
+        pass
+
+def is_pending(sim_params, bench_name, registry_dir=_DEFAULT_REGISTRY_DIR, sim_id=None):
+    """Checks whether a design point is currently in flight
+
+    Args:
+        sim_params: parameters for the simulator
+        bench_name: benchmark to be run with the simulator
+        registry_dir: registry directory
+        sim_id: identity of the simulator, see make_key()
+
+    Returns:
+        True if a simulation of the design point is running
+    """
+
+    key = make_key(sim_params, bench_name, sim_id)
+
+    return os.path.exists(_entry_path(registry_dir, key, _PENDING_EXT))
+
+def main(sim_params, sim_output_dir=None, bench_name=None, rm_sim_dir=False,
+         registry_dir=_DEFAULT_REGISTRY_DIR, sim_func=None,
+         poll_interval=_DEFAULT_POLL_INTERVAL, timeout=None,
+         max_pending_age=_DEFAULT_MAX_PENDING_AGE, sim_id=None):
+    """Runs a simulation once per design point across all drivers
+
+    A drop-in replacement for gem5_aladdin_interface.main(). If the design point
+        has been completed the recorded results are returned; if it is in flight
+        the call waits for its results; otherwise the simulation is run and its
+        results are recorded. A failed simulation records nothing, so a waiting
+        caller takes over and runs the design point itself.
+
+    Args:
+        sim_params: parameters for the simulator
+        sim_output_dir: directory to save simulator's production runs
+        bench_name: benchmark to be run with the simulator
+        rm_sim_dir: flag to rm simulation directory after the simulation
+        registry_dir: registry directory shared by the drivers
+        sim_func: function running the simulation, gem5_aladdin_interface.main()
+            by default
+        poll_interval: seconds between checks while waiting on a pending run
+        timeout: maximum seconds to wait on a pending run, None to wait until
+            the run finishes or its mark goes stale
+        max_pending_age: seconds after which a pending mark from any host is
+            treated as left behind by a crashed owner, None to trust marks from
+            other hosts forever
+        sim_id: identity of sim_func if it is not a gem5-aladdin run, e.g.
+            ReplaySimulator.sim_id, so that its results are never returned for
+            gem5-aladdin requests
+
+    Returns:
+        results: a dict mapping simulation results. For example:
+          results = {'area': 1094960.0, 'power': 67.5946, 'cycle': 65029}
+    """
+
+    if sim_func is None:
+        from base import gem5_aladdin_interface as gem5
+        sim_func = gem5.main
+
+        if bench_name is None:
+            bench_name = gem5._DEFAULT_BENCH
+
+    if not os.path.isdir(registry_dir):
+        try:
+            os.makedirs(registry_dir)
+        except OSError:
+            # created by a concurrent driver
+            pass
+
+    key = make_key(sim_params, bench_name, sim_id)
+
+    time_st = time.time()
+    while True:
+
+        results = get_result(key, registry_dir)
+        if results is not None:
+            return results
+
+        if _claim(key, registry_dir):
+            try:
+                # the owner may have finished between the check and the claim
+                results = get_result(key, registry_dir)
+                if results is None:
+                    results = sim_func(sim_params, sim_output_dir=sim_output_dir,
+                                       bench_name=bench_name, rm_sim_dir=rm_sim_dir)
+                    _store_result(key, sim_params, bench_name, results, registry_dir)
+            finally:
+                _release(key, registry_dir)
+
+            return results
+
+        owner = _read_owner(key, registry_dir)
+        if _is_stale(owner, max_pending_age):
+            _remove_stale(key, registry_dir, owner)
+            continue
+
+        if timeout is not None and time.time() - time_st > timeout:
+            raise RuntimeError('Timed out waiting for a pending simulation')
+
+        time.sleep(poll_interval)
@@ -0,0 +1,186 @@
+#!/usr/bin/python
+"""
+A module to replay recorded gem5-aladdin results instead of running simulations.
+
+A results file, such as analysis_example/Study_1/results.csv, is loaded as a
+    corpus. Recorded design points are served exactly and any other design point
+    is interpolated from its nearest recorded neighbours. ReplaySimulator.main()
+    has the signature of gem5_aladdin_interface.main(), so it plugs in wherever
+    the simulator is called. As sim_func of gem5_registry.main() it must be
+    passed together with sim_id=ReplaySimulator.sim_id, otherwise replayed
+    results are registered as gem5-aladdin results.
+"""
+
+import csv
+import os
+import time
+
+import numpy as np
+
+from base import gem5_constants
+
+_CONST_SUCCESS = 'success'
+_NON_PARAM_COLUMNS = [_CONST_SUCCESS, 'benchmark', 'run_time']
+
+# Default constants
+_DEFAULT_NEIGHBOURS = 8
+_PREDICT_CHUNK_SIZE = 1024
+
+def _is_true(value):
+    return value.strip().lower() in ('true', '1', '1.0')
+
+class ReplaySimulator(object):
+    """Objective serving recorded simulation results
+
+    Attributes:
+        param_names: names of the recorded parameters
+        targets: names of the recorded targets
+        X: a (n, d) matrix with the recorded parameter values
+        Y: a (n, t) matrix with the recorded target values
+        sim_id: identity of the replay in a gem5_registry
+    """
+
+    def __init__(self, results_file, param_names=None,
+                 targets=gem5_constants._CONST_TARGET_CHOICES_SIMULATOR,
+                 benchmark=None, neighbours=_DEFAULT_NEIGHBOURS, latency=0.0):
+        """Loads a corpus of recorded results
+
+        Args:
+            results_file: results file with parameter and target columns
+            param_names: parameter columns, by default all columns that are
+                neither targets nor bookkeeping
+            targets: target columns
+            benchmark: only rows of this benchmark are loaded if the file has a
+                benchmark column
+            neighbours: number of recorded neighbours interpolated from
+            latency: synthetic latency in seconds of each main() call
+        """
+
+        with open(results_file, 'r') as res_file:
+            reader = csv.reader(res_file)
+            header = [h.strip() for h in next(reader)]
+            rows = [row for row in reader if row]
+
+        if param_names is None:
+            param_names = [h for h in header if h not in targets and h not in _NON_PARAM_COLUMNS]
+
+        head_idx = dict((h, i) for i, h in enumerate(header))
+
+        X = []
+        Y = []
+        for row in rows:
+            if _CONST_SUCCESS in head_idx and not _is_true(row[head_idx[_CONST_SUCCESS]]):
+                continue
+
+            if benchmark is not None and 'benchmark' in head_idx and \
+                    row[head_idx['benchmark']].strip() != benchmark:
+                continue
+
+            try:
+                X.append([float(row[head_idx[p]]) for p in param_names])
+                Y.append([float(row[head_idx[t]]) for t in targets])
+            except ValueError:
+                continue
+
+        if not X:
+            raise ValueError('No successful results in {}'.format(results_file))
+
+        self.param_names = list(param_names)
+        self.targets = list(targets)
+        self.X = np.array(X)
+        self.Y = np.array(Y)
+
+        self.neighbours = min(neighbours, len(self.X))
+        self.latency = latency
+
+        # registry identity, see gem5_registry.make_key()
+        self.sim_id = 'replay:{}:{}:{}'.format(os.path.abspath(results_file),
+                                               benchmark, self.neighbours)
+
+        # the first record of a design point is served
+        self._lookup = {}
+        for idx, x in enumerate(map(tuple, self.X)):
+            self._lookup.setdefault(x, idx)
+
+        # parameters are scaled to [0, 1] for the neighbour search
+        self._lo = self.X.min(axis=0)
+        self._span = np.where(self.X.max(axis=0) > self._lo, self.X.max(axis=0) - self._lo, 1.0)
+
+    def domain(self):
+        """Returns a GPyOpt-style domain of the recorded parameter values
+
+        Unless the corpus is a full factorial grid, most designs of the domain
+            are not recorded and are served interpolated; designs() lists the
+            recorded ones.
+        """
+
+        return [{'name': p, 'type': 'discrete', 'domain': tuple(np.unique(self.X[:, j]))}
+                for j, p in enumerate(self.param_names)]
+
+    def designs(self):
+        """Returns the distinct recorded design points
+
+        Returns:
+            X: a (m, d) matrix with parameter values ordered as param_names
+        """
+
+        return np.unique(self.X, axis=0)
+
+    def predict(self, X):
+        """Returns the target values of a batch of design points
+
+        Args:
+            X: a (m, d) matrix with parameter values ordered as param_names
+
+        Returns:
+            Y: a (m, t) matrix with recorded or interpolated target values
+        """
+
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        Y = np.empty((len(X), len(self.targets)))
+
+        recorded = np.array([self._lookup.get(tuple(x), -1) for x in X], dtype=np.int64)
+        Y[recorded >= 0] = self.Y[recorded[recorded >= 0]]
+
+        missing = np.where(recorded < 0)[0]
+        corpus = (self.X - self._lo) / self._span
+
+        for start in range(0, len(missing), _PREDICT_CHUNK_SIZE):
+            idx = missing[start:start + _PREDICT_CHUNK_SIZE]
+            query = (X[idx] - self._lo) / self._span
+
+            # inverse distance weighting of the nearest recorded neighbours
+            dist = np.sqrt(((query[:, None, :] - corpus[None, :, :]) ** 2).sum(axis=2))
+            nearest = np.argpartition(dist, self.neighbours - 1, axis=1)[:, :self.neighbours]
+            weights = 1.0 / np.take_along_axis(dist, nearest, axis=1) ** 2
+
+            Y[idx] = np.einsum('ij,ijk->ik', weights, self.Y[nearest]) / weights.sum(axis=1)[:, None]
+
+        return Y
+
+    def main(self, sim_params, sim_output_dir=None, bench_name=None, rm_sim_dir=False):
+        """Replays a simulation run
+
+        Parameters that are not recorded in the corpus are ignored.
+
+        Args:
+            sim_params: parameters for the simulator
+            sim_output_dir: unused
+            bench_name: unused, the benchmark is chosen when loading the corpus
+            rm_sim_dir: unused
+
+        Returns:
+            results: a dict mapping simulation results. For example:
+              results = {'area': 1094960.0, 'power': 67.5946, 'cycle': 65029}
+        """
+
+        missing = [p for p in self.param_names if p not in sim_params]
+        if missing:
+            raise ValueError('Parameters missing from the request: {}'.format(', '.join(missing)))
+
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        x = [float(sim_params[p]) for p in self.param_names]
+
+        return dict(zip(self.targets, self.predict([x])[0].tolist()))
@@ -1,4 +1,4 @@
-import gem5_constants
+from base import gem5_constants
 
 def get_target_value(results, target_type):
     """ Returns the value of a target function depending on the target_type
@@ -0,0 +1,220 @@
+#!/usr/bin/python
+"""
+A module to screen simulator parameters with Morris elementary effects.
+
+Random one-at-a-time trajectories through the parameter levels are simulated,
+    the elementary effect of each parameter is measured on every trajectory and
+    parameters are ranked by the mean absolute effect (mu*). Parameters with a
+    small relative mu* are fixed to their level in the best screened design,
+    leaving a reduced domain for the optimiser.
+"""
+
+import json
+
+import numpy as np
+
+_CONST_FREE = 'free'
+_CONST_FIXED = 'fixed'
+_CONST_RANKING = 'ranking'
+_CONST_TARGET = 'target'
+_CONST_MAXIMIZE = 'maximize'
+
+# Default constants
+_DEFAULT_THRESHOLD = 0.1
+
+def _to_builtin(value):
+    if hasattr(value, 'item'):
+        value = value.item()
+
+    return value
+
+def morris_design(param_levels, no_of_trajectories, rng=None):
+    """Generates Morris trajectories over discrete parameter levels
+
+    Each trajectory starts at a random design and moves every parameter once,
+        in random order, by half of its number of levels.
+
+    Args:
+        param_levels: a list of lists with the levels of each parameter
+        no_of_trajectories: number of trajectories
+        rng: numpy RandomState, the global one by default
+
+    Returns:
+        samples: a (no_of_trajectories * (k + 1), k) matrix with parameter values
+        moved: a (no_of_trajectories, k) matrix with the parameter moved at each step
+        steps: a (no_of_trajectories, k) matrix with the steps scaled to the
+            parameter ranges
+    """
+
+    if rng is None:
+        rng = np.random
+
+    levels = [np.asarray(list(l)) for l in param_levels]
+    no_of_params = len(levels)
+    no_of_levels = np.array([len(l) for l in levels])
+
+    if np.any(no_of_levels < 2):
+        raise ValueError('Every screened parameter needs at least two levels')
+
+    deltas = np.maximum(1, no_of_levels // 2)
+
+    level_idx = np.empty((no_of_trajectories, no_of_params + 1, no_of_params), dtype=np.int64)
+    moved = np.empty((no_of_trajectories, no_of_params), dtype=np.int64)
+    steps = np.empty((no_of_trajectories, no_of_params))
+
+    for t in range(no_of_trajectories):
+        current = np.array([rng.randint(n) for n in no_of_levels])
+        level_idx[t, 0] = current
+
+        for s, p in enumerate(rng.permutation(no_of_params)):
+            up = current[p] + deltas[p] < no_of_levels[p]
+            down = current[p] - deltas[p] >= 0
+
+            direction = 1 if up and (not down or rng.rand() < 0.5) else -1
+
+            current = current.copy()
+            current[p] += direction * deltas[p]
+
+            level_idx[t, s + 1] = current
+            moved[t, s] = p
+            steps[t, s] = direction * deltas[p] / float(no_of_levels[p] - 1)
+
+    level_idx = level_idx.reshape(-1, no_of_params)
+    samples = np.column_stack([l[level_idx[:, j]] for j, l in enumerate(levels)])
+
+    return samples, moved, steps
+
+def morris_effects(values, moved, steps):
+    """Computes the Morris statistics of each parameter
+
+    Effects involving a failed simulation, given as NaN, are left out.
+
+    Args:
+        values: target values of the samples of morris_design()
+        moved: parameters moved at each step, as returned by morris_design()
+        steps: scaled steps, as returned by morris_design()
+
+    Returns:
+        mu_star: mean absolute elementary effect of each parameter
+        mu: mean elementary effect of each parameter
+        sigma: standard deviation of the elementary effects of each parameter
+    """
+
+    no_of_trajectories, no_of_params = moved.shape
+
+    values = np.asarray(values, dtype=np.float64).reshape(no_of_trajectories, no_of_params + 1)
+    effects = np.diff(values, axis=1) / steps
+
+    valid = np.isfinite(effects)
+
+    count = np.bincount(moved[valid], minlength=no_of_params).astype(np.float64)
+    total = np.bincount(moved[valid], weights=effects[valid], minlength=no_of_params)
+    total_abs = np.bincount(moved[valid], weights=np.abs(effects[valid]), minlength=no_of_params)
+    total_sq = np.bincount(moved[valid], weights=effects[valid] ** 2, minlength=no_of_params)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mu = total / count
+        mu_star = total_abs / count
+        sigma = np.sqrt(np.maximum(total_sq / count - mu * mu, 0.0))
+
+    return mu_star, mu, sigma
+
+def rank_parameters(param_names, mu_star, mu, sigma):
+    """Ranks parameters by their mean absolute elementary effect
+
+    Returns:
+        ranking: a list of dicts with parameter, mu_star, mu, sigma and
+            relative_mu_star, most influential first
+    """
+
+    max_mu_star = np.nanmax(mu_star) if np.any(np.isfinite(mu_star)) else 0.0
+
+    ranking = []
+    for name, m_s, m, s in zip(param_names, mu_star, mu, sigma):
+        ranking.append({'parameter': name,
+                        'mu_star': float(m_s),
+                        'mu': float(m),
+                        'sigma': float(s),
+                        'relative_mu_star': float(m_s / max_mu_star)
+                            if max_mu_star > 0 and np.isfinite(m_s) else 0.0})
+
+    ranking.sort(key=lambda r: -r['relative_mu_star'])
+
+    return ranking
+
+def reduce_domain(param_levels, ranking, best_params, threshold=_DEFAULT_THRESHOLD):
+    """Splits the parameters into free ones and ones fixed to their best level
+
+    Args:
+        param_levels: a dict mapping parameter names to their levels
+        ranking: parameter ranking, as returned by rank_parameters()
+        best_params: parameters of the best screened design
+        threshold: relative mu* below which a parameter is fixed
+
+    Returns:
+        reduced: a dict with the 'free' parameters and their levels and the
+            'fixed' parameters and their values
+    """
+
+    relative = dict((r['parameter'], r['relative_mu_star']) for r in ranking)
+
+    reduced = {_CONST_FREE: {}, _CONST_FIXED: {}}
+    for name, levels in param_levels.items():
+        if relative.get(name, 0.0) >= threshold:
+            reduced[_CONST_FREE][name] = [_to_builtin(v) for v in levels]
+        else:
+            reduced[_CONST_FIXED][name] = _to_builtin(best_params[name])
+
+    return reduced
+
+def save_screening(file_name, ranking, reduced, target, maximize):
+    """Saves a parameter ranking and the reduced domain to a file
+
+    Args:
+        file_name: screening file
+        ranking: parameter ranking, as returned by rank_parameters()
+        reduced: reduced domain, as returned by reduce_domain()
+        target: target function the parameters were screened on
+        maximize: flag set if the best design maximised the target
+    """
+
+    with open(file_name, 'w') as f:
+        json.dump({_CONST_TARGET: target,
+                   _CONST_MAXIMIZE: bool(maximize),
+                   _CONST_RANKING: ranking,
+                   _CONST_FREE: reduced[_CONST_FREE],
+                   _CONST_FIXED: reduced[_CONST_FIXED]}, f, indent=1)
+
+def load_domain(file_name, target=None, maximize=None):
+    """Loads a reduced domain saved by save_screening()
+
+    Parameters are fixed at their levels in the best design for the screened
+        target, so the domain is only valid for optimising the same target in
+        the same direction.
+
+    Args:
+        file_name: screening file
+        target: target function of the optimisation, None to skip the check
+        maximize: flag set if the optimisation maximises the target, None to
+            skip the check
+
+    Returns:
+        bds: GPyOpt-style domain of the free parameters
+        fixed_params: a dict mapping the fixed parameters to their values
+    """
+
+    with open(file_name, 'r') as f:
+        screening = json.load(f)
+
+    if target is not None and screening.get(_CONST_TARGET) != target:
+        raise ValueError('{} was screened for target {}, not {}'.format(
+            file_name, screening.get(_CONST_TARGET), target))
+
+    if maximize is not None and screening.get(_CONST_MAXIMIZE) != bool(maximize):
+        raise ValueError('{} was screened to {} the target'.format(
+            file_name, 'maximise' if screening.get(_CONST_MAXIMIZE) else 'minimise'))
+
+    bds = [{'name': name, 'type': 'discrete', 'domain': tuple(levels)}
+           for name, levels in screening[_CONST_FREE].items()]
+
+    return bds, screening[_CONST_FIXED]
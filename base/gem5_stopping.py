@@ -0,0 +1,201 @@
+#!/usr/bin/python
+"""
+A module with stopping rules for sampling and optimisation studies.
+
+Each rule is updated with a dict of information after every result, e.g. the
+    results dict of a simulation with its 'success' flag and 'run_time', or the
+    'expected_improvement' of the next candidate, and reports whether the study
+    should stop. Keys a rule does not use are ignored.
+"""
+
+import collections
+import time
+
+import numpy as np
+
+from base import gem5_pareto
+
+_CONST_SUCCESS = 'success'
+_CONST_RUN_TIME = 'run_time'
+_CONST_EXPECTED_IMPROVEMENT = 'expected_improvement'
+
+# Reference point margin over the worst observed objectives
+_HV_REF_MARGIN = 0.1
+
+class NoImprovement(object):
+    """Stops when the best target value has not improved for a number of evaluations"""
+
+    def __init__(self, target, patience, maximize=False, min_delta=0.0):
+        """
+        Args:
+            target: a key value for the target
+            patience: number of evaluations without improvement before stopping
+            maximize: flag to treat larger target values as better
+            min_delta: minimum change of the best value counted as improvement
+        """
+
+        self.target = target
+        self.patience = patience
+        self.maximize = maximize
+        self.min_delta = min_delta
+
+        self.best = None
+        self.since_best = 0
+        self.reason = None
+
+    def update(self, info):
+        if self.target not in info or not info.get(_CONST_SUCCESS, True):
+            return self.reason is not None
+
+        value = float(info[self.target])
+        sign = 1.0 if self.maximize else -1.0
+
+        if self.best is None or sign * (value - self.best) > self.min_delta:
+            self.best = value
+            self.since_best = 0
+        else:
+            self.since_best += 1
+
+        if self.since_best >= self.patience:
+            self.reason = "No improvement of {} in {} evaluations".format(self.target, self.patience)
+
+        return self.reason is not None
+
+class HypervolumePlateau(object):
+    """Stops when the hypervolume of a Pareto front has stopped growing
+
+    The hypervolume of the current front is compared to that of the front a
+        number of evaluations ago. Without a fixed reference point both are
+        computed against the worst objectives observed so far plus a margin.
+    """
+
+    def __init__(self, archive, patience, rel_tol=1e-3, ref_point=None):
+        """
+        Args:
+            archive: gem5_pareto.ParetoArchive updated with every result
+            patience: number of evaluations over which the growth is measured
+            rel_tol: relative growth of the hypervolume below which to stop
+            ref_point: hypervolume reference point
+        """
+
+        self.archive = archive
+        self.patience = patience
+        self.rel_tol = rel_tol
+        self.ref_point = ref_point
+
+        self._fronts = collections.deque(maxlen=patience + 1)
+        self._worst = None
+        self._evaluations = None
+        self.reason = None
+
+    def update(self, info):
+        if self.archive.evaluations == self._evaluations:
+            return self.reason is not None
+
+        self._evaluations = self.archive.evaluations
+
+        front, _ = self.archive.front()
+        if len(front) == 0:
+            return self.reason is not None
+
+        self._fronts.append(front)
+
+        worst = front.max(axis=0)
+        self._worst = worst if self._worst is None else np.maximum(self._worst, worst)
+
+        if len(self._fronts) <= self.patience:
+            return self.reason is not None
+
+        ref_point = self.ref_point
+        if ref_point is None:
+            ref_point = self._worst + _HV_REF_MARGIN * np.abs(self._worst)
+
+        hv_old = gem5_pareto.hypervolume(self._fronts[0], ref_point)
+        hv_new = gem5_pareto.hypervolume(self._fronts[-1], ref_point)
+
+        if hv_new - hv_old <= self.rel_tol * hv_new:
+            self.reason = "Hypervolume plateau over {} evaluations".format(self.patience)
+
+        return self.reason is not None
+
+class AcquisitionBelow(object):
+    """Stops when the expected improvement of the next candidate is below a threshold"""
+
+    def __init__(self, threshold):
+        """
+        Args:
+            threshold: expected improvement below which to stop
+        """
+
+        self.threshold = threshold
+        self.reason = None
+
+    def update(self, info):
+        if info.get(_CONST_EXPECTED_IMPROVEMENT) is not None and \
+                info[_CONST_EXPECTED_IMPROVEMENT] < self.threshold:
+            self.reason = "Expected improvement {} below {}".format(
+                info[_CONST_EXPECTED_IMPROVEMENT], self.threshold)
+
+        return self.reason is not None
+
+class Budget(object):
+    """Stops when the wall-clock or the accumulated simulation time runs out"""
+
+    def __init__(self, wall_clock=None, sim_time=None):
+        """
+        Args:
+            wall_clock: seconds since the rule was created, None for no limit
+            sim_time: seconds of simulation 'run_time' summed over the results,
+                None for no limit
+        """
+
+        self.wall_clock = wall_clock
+        self.sim_time = sim_time
+
+        self.time_st = time.time()
+        self.sim_time_used = 0.0
+        self.reason = None
+
+    def update(self, info):
+        if info.get(_CONST_RUN_TIME) is not None:
+            self.sim_time_used += info[_CONST_RUN_TIME]
+
+        if self.wall_clock is not None and time.time() - self.time_st >= self.wall_clock:
+            self.reason = "Wall-clock budget of {} s used".format(self.wall_clock)
+
+        if self.sim_time is not None and self.sim_time_used >= self.sim_time:
+            self.reason = "Simulation budget of {} s used".format(self.sim_time)
+
+        return self.reason is not None
+
+class StoppingRules(object):
+    """Stops when any of a list of rules does"""
+
+    def __init__(self, rules):
+        """
+        Args:
+            rules: a list of stopping rules
+        """
+
+        self.rules = rules
+        self.reason = None
+
+    @property
+    def stop(self):
+        return self.reason is not None
+
+    def update(self, info):
+        """Updates every rule with the information on a new result
+
+        Args:
+            info: a dict with the information on a new result
+
+        Returns:
+            True if the study should stop
+        """
+
+        for rule in self.rules:
+            if rule.update(info) and self.reason is None:
+                self.reason = rule.reason
+
+        return self.stop
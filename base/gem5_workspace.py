@@ -0,0 +1,323 @@
+#!/usr/bin/python
+"""
+A module to manage the disk space used by gem5-aladdin simulation runs.
+
+Simulations are run in a scratch directory (e.g. a local tmpfs) and, once
+    finished, their parsed results and compressed outputs are kept in an archive.
+    Full simulation directories are kept only for the top-k designs and the
+    archive is held under a disk quota by pruning the least recently used data.
+    Each entry keeps an access stamp that is refreshed whenever its data is
+    archived, kept or loaded.
+"""
+
+import errno
+import gzip
+import json
+import os
+import shutil
+import time
+import uuid
+
+from base import gem5_aladdin_interface as gem5
+
+# Workspace locations, can be set via the environment
+_SCRATCH_DIR_ENV = 'BOAT_SCRATCH_DIR'
+_ARCHIVE_DIR_ENV = 'BOAT_ARCHIVE_DIR'
+
+_DEFAULT_SCRATCH_DIR = os.environ.get(_SCRATCH_DIR_ENV, gem5._GEM5_SWEEPS_PATH)
+_DEFAULT_ARCHIVE_DIR = os.environ.get(_ARCHIVE_DIR_ENV, 'gem5_archive')
+
+# Simulation outputs that are compressed into the archive
+_ARCHIVED_FILES = ['stdout', 'stats.txt']
+
+_ENTRY_RESULTS_FILE = 'results.json'
+_ENTRY_ACCESS_FILE = 'last_access'
+_ENTRY_SIM_DIR = 'sim'
+_GZIP_EXT = '.gz'
+
+# Default constants
+_DEFAULT_MIN_FREE_BYTES = 2 * 1024 ** 3
+
+def _dir_size(dir_path):
+    """Returns the total size in bytes of the files under a directory"""
+
+    size = 0
+    for root, _, files in os.walk(dir_path):
+        for file_name in files:
+            try:
+                size += os.path.getsize(os.path.join(root, file_name))
+            except OSError:
+                pass
+
+    return size
+
+def _check_free_space(dir_path, min_free_bytes):
+    """Raises ENOSPC before a run if a directory is short of free space"""
+
+    if min_free_bytes is None:
+        return
+
+    free_bytes = shutil.disk_usage(dir_path).free
+
+    if free_bytes < min_free_bytes:
+        raise OSError(errno.ENOSPC,
+                      'Only {} bytes free, {} required'.format(free_bytes, min_free_bytes),
+                      dir_path)
+
+def _compress_file(src_path, dst_path):
+    with open(src_path, 'rb') as src_file:
+        with gzip.open(dst_path, 'wb') as dst_file:
+            shutil.copyfileobj(src_file, dst_file)
+
+def _touch_access(entry_dir):
+    """Marks an archive entry as used now"""
+
+    with open(os.path.join(entry_dir, _ENTRY_ACCESS_FILE), 'a'):
+        pass
+
+    os.utime(os.path.join(entry_dir, _ENTRY_ACCESS_FILE), None)
+
+def _last_access(entry_dir):
+    """Returns the time an archive entry was last used"""
+
+    for file_name in [_ENTRY_ACCESS_FILE, _ENTRY_RESULTS_FILE]:
+        try:
+            return os.path.getmtime(os.path.join(entry_dir, file_name))
+        except OSError:
+            pass
+
+    return 0.0
+
+def archive_run(sim_output_dir, entry_dir, sim_params, bench_name, results):
+    """Archives parsed results and compressed outputs of a simulation run
+
+    Args:
+        sim_output_dir: directory with the simulator's production run
+        entry_dir: archive entry directory to be created
+        sim_params: parameters for the simulator
+        bench_name: benchmark run with the simulator
+        results: a dict mapping simulation results, None if the run failed
+    """
+
+    os.makedirs(entry_dir)
+
+    # compresses the first occurrence of each archived output
+    archived = []
+    for root, _, files in os.walk(sim_output_dir):
+        for file_name in files:
+            if file_name in _ARCHIVED_FILES and file_name not in archived:
+                _compress_file(os.path.join(root, file_name),
+                               os.path.join(entry_dir, file_name + _GZIP_EXT))
+                archived.append(file_name)
+
+    entry = {'benchmark': bench_name,
+             'params': dict((str(k), v.item() if hasattr(v, 'item') else v)
+                            for k, v in sim_params.items()),
+             'success': results is not None,
+             'results': results,
+             'time': time.time()}
+
+    with open(os.path.join(entry_dir, _ENTRY_RESULTS_FILE), 'w') as res_file:
+        json.dump(entry, res_file)
+
+    _touch_access(entry_dir)
+
+def load_entry(entry_dir):
+    """Loads an archive entry and marks it as recently used
+
+    Args:
+        entry_dir: archive entry directory
+
+    Returns:
+        entry: a dict with 'benchmark', 'params', 'success' and 'results'
+    """
+
+    results_path = os.path.join(entry_dir, _ENTRY_RESULTS_FILE)
+
+    with open(results_path, 'r') as res_file:
+        entry = json.load(res_file)
+
+    _touch_access(entry_dir)
+
+    return entry
+
+def list_entries(archive_dir=_DEFAULT_ARCHIVE_DIR):
+    """Lists the archive entry directories
+
+    Args:
+        archive_dir: archive directory
+
+    Returns:
+        a list of full paths to the entries holding parsed results
+    """
+
+    if not os.path.isdir(archive_dir):
+        return []
+
+    entries = [os.path.join(archive_dir, name) for name in sorted(os.listdir(archive_dir))]
+
+    return [e for e in entries if os.path.isfile(os.path.join(e, _ENTRY_RESULTS_FILE))]
+
+def _kept_entries(archive_dir, bench_name, target, maximize):
+    """Ranks the entries of a benchmark that keep a full simulation directory
+
+    Returns:
+        kept: a list of (target value, entry directory) pairs, best first
+    """
+
+    from base import gem5_results
+
+    kept = []
+    for entry_dir in list_entries(archive_dir):
+        if not os.path.isdir(os.path.join(entry_dir, _ENTRY_SIM_DIR)):
+            continue
+
+        with open(os.path.join(entry_dir, _ENTRY_RESULTS_FILE), 'r') as res_file:
+            entry = json.load(res_file)
+
+        # target values of different benchmarks are not comparable
+        if entry['benchmark'] != bench_name:
+            continue
+
+        kept.append((gem5_results.get_target_value(entry['results'], target), entry_dir))
+
+    kept.sort(reverse=maximize)
+
+    return kept
+
+def _is_top_k(value, kept, keep_top_k, maximize):
+    """Checks whether a target value ranks among the kept top-k designs"""
+
+    if len(kept) < keep_top_k:
+        return True
+
+    worst = kept[keep_top_k - 1][0]
+
+    return value > worst if maximize else value < worst
+
+def _keep_top_k(archive_dir, bench_name, keep_top_k, target, maximize):
+    """Removes the full simulation directories of a benchmark not among the top-k designs"""
+
+    for _, entry_dir in _kept_entries(archive_dir, bench_name, target, maximize)[keep_top_k:]:
+        shutil.rmtree(os.path.join(entry_dir, _ENTRY_SIM_DIR), ignore_errors=True)
+
+def prune_archive(archive_dir=_DEFAULT_ARCHIVE_DIR, quota_bytes=None):
+    """Holds the archive under a disk quota by least recently used pruning
+
+    Full simulation directories are pruned first, then compressed outputs.
+        Parsed results are never pruned.
+
+    Args:
+        archive_dir: archive directory
+        quota_bytes: maximum size of the archive in bytes, None for no quota
+
+    Returns:
+        total: size of the archive in bytes after pruning
+    """
+
+    entries = list_entries(archive_dir)
+    total = _dir_size(archive_dir)
+
+    if quota_bytes is None or total <= quota_bytes:
+        return total
+
+    # least recently used first, by access stamp since removing data from an
+    #   entry changes the modification time of its directory
+    entries.sort(key=_last_access)
+
+    for entry_dir in entries:
+        sim_dir = os.path.join(entry_dir, _ENTRY_SIM_DIR)
+        if os.path.isdir(sim_dir):
+            total -= _dir_size(sim_dir)
+            shutil.rmtree(sim_dir, ignore_errors=True)
+
+            if total <= quota_bytes:
+                return total
+
+    for entry_dir in entries:
+        for file_name in _ARCHIVED_FILES:
+            file_path = os.path.join(entry_dir, file_name + _GZIP_EXT)
+            if os.path.isfile(file_path):
+                total -= os.path.getsize(file_path)
+                os.remove(file_path)
+
+        if total <= quota_bytes:
+            return total
+
+    return total
+
+def main(sim_params, sim_output_dir=None, bench_name=gem5._DEFAULT_BENCH,
+         rm_sim_dir=True, scratch_dir=_DEFAULT_SCRATCH_DIR,
+         archive_dir=_DEFAULT_ARCHIVE_DIR, keep_top_k=0, target=None,
+         maximize=False, quota_bytes=None, min_free_bytes=_DEFAULT_MIN_FREE_BYTES,
+         sim_func=gem5.main):
+    """Runs a simulation in scratch space and archives it under the retention policy
+
+    A drop-in replacement for gem5_aladdin_interface.main().
+
+    Args:
+        sim_params: parameters for the simulator
+        sim_output_dir: directory to save simulator's production runs, a new
+            directory in scratch_dir by default
+        bench_name: benchmark to be run with the simulator
+        rm_sim_dir: flag to rm simulation directory after archiving, unless it
+            is kept as one of the top-k designs
+        scratch_dir: directory where simulations are run, e.g. a local tmpfs
+        archive_dir: directory where parsed results and compressed outputs are kept
+        keep_top_k: number of designs of the benchmark for which full
+            directories are kept, a directory is moved into the archive only if
+            its design ranks among them
+        target: a key value for the target function ranking the designs
+        maximize: flag to rank larger target values as better
+        quota_bytes: maximum size of the archive in bytes, None for no quota
+        min_free_bytes: free space required in scratch_dir and archive_dir
+            before a run is started, None to skip the check
+        sim_func: function running the simulation
+
+    Returns:
+        results: a dict mapping simulation results. For example:
+          results = {'area': 1094960.0, 'power': 67.5946, 'cycle': 65029}
+    """
+
+    sim_name = "{}{}".format("sim_", str(uuid.uuid4())[:12])
+
+    if sim_output_dir is None:
+        sim_output_dir = os.path.join(scratch_dir, sim_name)
+
+    for dir_path in [os.path.dirname(os.path.abspath(sim_output_dir)), archive_dir]:
+        if not os.path.isdir(dir_path):
+            os.makedirs(dir_path)
+
+    # makes room in the archive and fails early rather than mid-simulation
+    prune_archive(archive_dir, quota_bytes)
+    _check_free_space(os.path.dirname(os.path.abspath(sim_output_dir)), min_free_bytes)
+    _check_free_space(archive_dir, min_free_bytes)
+
+    results = None
+    try:
+        results = sim_func(sim_params, sim_output_dir=sim_output_dir,
+                           bench_name=bench_name, rm_sim_dir=False)
+    finally:
+        entry_dir = os.path.join(archive_dir, "{}_{}".format(bench_name, sim_name))
+        archive_run(sim_output_dir, entry_dir, sim_params, bench_name, results)
+
+        # only directories of top-k designs leave the scratch space
+        keep = False
+        if results is not None and keep_top_k > 0:
+            from base import gem5_results
+
+            kept = _kept_entries(archive_dir, bench_name, target, maximize)
+            keep = _is_top_k(gem5_results.get_target_value(results, target), kept,
+                             keep_top_k, maximize)
+
+        if keep:
+            shutil.move(sim_output_dir, os.path.join(entry_dir, _ENTRY_SIM_DIR))
+            _touch_access(entry_dir)
+            _keep_top_k(archive_dir, bench_name, keep_top_k, target, maximize)
+
+        elif rm_sim_dir and os.path.isdir(sim_output_dir):
+            shutil.rmtree(sim_output_dir)
+
+    prune_archive(archive_dir, quota_bytes)
+
+    return results
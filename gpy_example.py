@@ -1,7 +1,9 @@
 #!/usr/bin/python
 
 import sys
+import time
 import random
+import functools
 
 import numpy as np
 import matplotlib
@@ -13,7 +15,13 @@ import GPyOpt
 from GPyOpt.methods import BayesianOptimization
 
 sys.path.append("./")
-from base import gem5_aladdin_interface as gem5
+from base import gem5_registry
+from base import gem5_workspace
+from base import gem5_pareto
+from base import gem5_stopping
+from base import gem5_acquisition
+from base import gem5_multitask
+from base import gem5_screening
 from base import gem5_results
 from base import gem5_constants
     
@@ -52,8 +60,54 @@ _BDS = [
     {'name': 'tlb_hit_latency', 'type': 'discrete', 'domain': (1, 2, 3, 4)}
     ]
 
+# Reduced domain saved by the screening mode of sample_gem5_parameters.py, e.g.
+#   "aes_aes_screening.json". Parameters fixed by the screening are set to their
+#   best level in every simulation.
+_SCREENING_FILE = None
+_FIXED_PARAMS = {}
+
+if _SCREENING_FILE is not None:
+    _BDS, _FIXED_PARAMS = gem5_screening.load_domain(_SCREENING_FILE, target=_TARGET,
+                                                     maximize=True)
+
 _RESULTS_FILE = "results.csv"
 
+# Results of other benchmarks, e.g. "<benchmark>_results.csv" files written by
+#   sample_gem5_parameters.py, used as prior tasks of a multi-task surrogate
+_PRIOR_RESULTS_FILES = []
+
+# Random simulations before the multi-task surrogate takes over, two being the
+#   fewest that fix the scale of the new benchmark's standardised targets
+_PRIOR_INITIAL_DESIGN = 2
+
+# Domain values of the categorical parameters to simulator parameter values
+_VALUE_MAPS = {'cache_size': _GEM5_DICT_CACHE_SIZE,
+               'cache_assoc': _GEM5_DICT_CACHE_ASSOC,
+               'cache_line_sz': _GEM5_DICT_CACHE_LINE_SZ}
+
+# Optimisation budget and stopping rules
+_MAX_ITER = 10
+_PATIENCE = 5
+_EI_THRESHOLD = 1e-4
+_SIM_HOURS_BUDGET = 12
+
+# Retention of simulation outputs: full directories of the top-k designs, and
+#   a disk quota of the archive of parsed results and compressed outputs
+_KEEP_TOP_K = 3
+_ARCHIVE_QUOTA_BYTES = 50 * 1024 ** 3
+
+
+def _screened_params(params):
+    """Maps parameters of a results file to the values of a screened domain
+
+    Results files store tlb_entries multiplied by tlb_assoc, the screened domain
+        keeps the multiples as sample_gem5_parameters.py samples them.
+    """
+
+    params = dict(params)
+    params['tlb_entries'] = float(params['tlb_entries']) / float(params['tlb_assoc'])
+
+    return params
 
 def write_to_file(file_name, bds, parameters=None, success=None, result=None, add_head=False, overwrite=False):
     """Writes results to a file
@@ -102,13 +156,23 @@ if __name__ == "__main__":
     # Creates an output file with a header
     write_to_file(_RESULTS_FILE, _BDS, add_head=True, overwrite=True)
 
+    # Pareto front over cycle, power and area of the evaluated designs
+    pareto_archive = gem5_pareto.ParetoArchive(gem5_constants._CONST_TARGET_CHOICES_SIMULATOR)
+
+    stopping = gem5_stopping.StoppingRules([
+        gem5_stopping.NoImprovement(_TARGET, _PATIENCE, maximize=True),
+        gem5_stopping.AcquisitionBelow(_EI_THRESHOLD),
+        gem5_stopping.Budget(sim_time=_SIM_HOURS_BUDGET * 3600)])
+
     def simulator(parameters):
 
         # setting gem5-aladdin parameters
         params = {}
         for idx, bd in enumerate(_BDS):
             param_name = bd['name']
-            if param_name == "cache_size":
+            if bd['type'] == 'discrete':
+                value = int(parameters[0][idx])
+            elif param_name == "cache_size":
                 value = _GEM5_DICT_CACHE_SIZE[int(parameters[0][idx])]
             elif param_name == "cache_assoc":
                 value = _GEM5_DICT_CACHE_ASSOC[int(parameters[0][idx])]
@@ -128,32 +192,95 @@ if __name__ == "__main__":
                 value = int(parameters[0][idx])
             
             params[param_name] = value
+
+        params.update(_FIXED_PARAMS)
+
+        # screened tlb_entries are multiples of tlb_assoc, as in sample_gem5_parameters.py
+        if _SCREENING_FILE is not None and 'tlb_entries' in params and 'tlb_assoc' in params:
+            params['tlb_entries'] = params['tlb_entries'] * params['tlb_assoc']
         
-        gem5_result = gem5.main(params, rm_sim_dir=True, bench_name=_BENCHMARK)
+        # keeps full simulation directories of the best designs only
+        sim_func = functools.partial(gem5_workspace.main, keep_top_k=_KEEP_TOP_K,
+                                     target=_TARGET, maximize=True,
+                                     quota_bytes=_ARCHIVE_QUOTA_BYTES)
+
+        time_st = time.time()
+        gem5_result = gem5_registry.main(params, rm_sim_dir=True, bench_name=_BENCHMARK,
+                                         sim_func=sim_func)
+        run_time = time.time() - time_st
 
         try:
             success = 1
             result = gem5_results.get_target_value(gem5_result, _TARGET)
+            pareto_archive.add(gem5_result, payload=params)
         except:
             success = 0
             result = 0.0
             
         write_to_file(_RESULTS_FILE, _BDS, parameters=parameters, success=success, result=result)
 
+        stopping.update({_TARGET: result, 'success': success, 'run_time': run_time})
+
         print("Params: ", params, " Result: ", result)
 
         return result  
 
+    model_kwargs = {}
+    if _PRIOR_RESULTS_FILES:
+        params_func = None
+        if _SCREENING_FILE is not None and 'tlb_entries' in [bd['name'] for bd in _BDS]:
+            params_func = _screened_params
+
+        prior_tasks = [gem5_multitask.load_task_data(f, _BDS, _TARGET, value_maps=_VALUE_MAPS,
+                                                     params_func=params_func)
+                       for f in _PRIOR_RESULTS_FILES]
+        model_kwargs['model'] = gem5_multitask.MultiTaskModel(prior_tasks, maximize=True)
+
+        # the informed model chooses all but the first few simulations
+        model_kwargs['initial_design_numdata'] = _PRIOR_INITIAL_DESIGN
+
     optimizer = BayesianOptimization(f=simulator, 
                                         domain=_BDS,
                                         model_type='GP',
                                         acquisition_type ='EI',
                                         exact_feval=True,
                                         maximize=True,
-                                        de_duplication=True)
+                                        de_duplication=True,
+                                        **model_kwargs)
 
-    optimizer.run_optimization(max_iter=10, verbosity=True)
+    # scores every design of the discrete domain instead of relaxing and rounding,
+    #   unless the domain is too large to be enumerated
+    if gem5_acquisition.domain_size(_BDS) <= gem5_acquisition._DEFAULT_MAX_CANDIDATES:
+        optimizer.acquisition.optimizer = gem5_acquisition.ExhaustiveAcquisitionOptimizer(
+            optimizer.space, _BDS)
+
+    # one iteration at a time, so that the stopping rules are checked after each
+    #   result; the model is fitted once per iteration by suggest_next_locations()
+    for _ in range(_MAX_ITER):
+        if stopping.stop:
+            break
+
+        x_next = optimizer.suggest_next_locations()
+
+        # expected improvement of the next candidate under the fitted model
+        ei = -optimizer.acquisition.acquisition_function(optimizer.space.unzip_inputs(x_next))
+        if stopping.update({'expected_improvement': float(np.max(ei))}):
+            break
+
+        optimizer.suggested_sample = x_next
+        optimizer.X = np.vstack((optimizer.X, x_next))
+        optimizer.evaluate_objective()
+
+    # refits the model to the last result and computes the best designs found
+    optimizer.run_optimization(max_iter=0)
+
+    if stopping.stop:
+        print("Stopped early: {}".format(stopping.reason))
 
     optimizer.plot_acquisition(filename = "acquisition.png")
 
-    optimizer.plot_convergence(filename = "convergence.png")
\ No newline at end of file
+    optimizer.plot_convergence(filename = "convergence.png")
+
+    front, front_params = pareto_archive.front()
+    for point, params in zip(front, front_params):
+        print("Pareto optimal: ", params, " ", dict(zip(pareto_archive.objectives, point)))
\ No newline at end of file
@@ -0,0 +1,257 @@
+#!/usr/bin/python
+"""
+A script to benchmark optimiser settings offline on replayed gem5-aladdin results.
+
+Runs seeded optimisation trials of each optimiser configuration in parallel
+    against a ReplaySimulator built from a recorded results file and reports
+    the regret curves, i.e. the gap between the best design found after each
+    evaluation and the best recorded design. The optimisers choose among the
+    recorded design points only, so that every evaluation is served exactly.
+"""
+
+import argparse
+import random
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+sys.path.append("./")
+
+from base import gem5_acquisition
+from base import gem5_constants
+from base import gem5_replay
+from base import gem5_results
+
+# Optimiser configurations to be compared
+_CONFIGS = {
+    'random': {'optimiser': 'random'},
+    'bo_ei_matern52': {'optimiser': 'bo', 'acquisition': 'EI', 'kernel': 'Matern52', 'batch_size': 1},
+    'bo_ei_rbf': {'optimiser': 'bo', 'acquisition': 'EI', 'kernel': 'RBF', 'batch_size': 1},
+    'bo_lcb_matern52': {'optimiser': 'bo', 'acquisition': 'LCB', 'kernel': 'Matern52', 'batch_size': 1},
+    'bo_ei_matern52_batch4': {'optimiser': 'bo', 'acquisition': 'EI', 'kernel': 'Matern52', 'batch_size': 4},
+}
+
+_DEFAULT_RESULTS_FILE = "analysis_example/Study_1/results.csv"
+_DEFAULT_REGRET_FILE = "regret.csv"
+
+_INITIAL_DESIGN = 5
+
+# replay objective and recorded design points of each worker process
+_REPLAY = None
+_CANDIDATES = None
+
+def _init_worker(results_file, latency):
+    global _REPLAY, _CANDIDATES
+    _REPLAY = gem5_replay.ReplaySimulator(results_file, latency=latency)
+    _CANDIDATES = _REPLAY.designs()
+
+def _target_value(x, target):
+    """Replays a design point and returns its target value"""
+
+    results = _REPLAY.main(dict(zip(_REPLAY.param_names, x)))
+
+    return gem5_results.get_target_value(results, target)
+
+def _random_trial(candidates, target, budget, rng):
+    """Evaluates recorded design points drawn uniformly without replacement"""
+
+    idx = rng.choice(len(candidates), min(budget, len(candidates)), replace=False)
+
+    return [_target_value(x, target) for x in candidates[idx]]
+
+def _bo_trial(bds, candidates, target, budget, config, maximize, rng):
+    """Evaluates recorded design points chosen by GPyOpt
+
+    Batches are the batch_size recorded designs with the best acquisition
+        values under the same fitted model.
+    """
+
+    import GPy
+    from GPyOpt.methods import BayesianOptimization
+
+    values = []
+
+    def objective(X):
+        y = np.array([[_target_value(x, target)] for x in X])
+        values.extend(y[:, 0])
+        return y
+
+    budget = min(budget, len(candidates))
+    batch_size = config['batch_size']
+
+    X_init = candidates[rng.choice(len(candidates), min(_INITIAL_DESIGN, budget), replace=False)]
+
+    # GPyOpt evaluates the objective in this worker, its batch evaluators would
+    #   fork a pool of their own
+    optimizer = BayesianOptimization(f=objective,
+                                     domain=bds,
+                                     X=X_init,
+                                     model_type='GP',
+                                     kernel=getattr(GPy.kern, config['kernel'])(input_dim=len(bds)),
+                                     acquisition_type=config['acquisition'],
+                                     exact_feval=True,
+                                     maximize=maximize,
+                                     de_duplication=True)
+
+    optimizer.acquisition.optimizer = gem5_acquisition.ExhaustiveAcquisitionOptimizer(
+        optimizer.space, bds, candidates=candidates)
+
+    while len(values) < budget:
+
+        # fits the model to the results so far
+        optimizer.suggest_next_locations()
+
+        X_batch, _ = gem5_acquisition.top_k(optimizer.acquisition.acquisition_function, bds,
+                                            k=min(batch_size, budget - len(values)),
+                                            exclude=optimizer.X,
+                                            encode=optimizer.acquisition.optimizer.encode,
+                                            candidates=candidates)
+
+        optimizer.suggested_sample = X_batch
+        optimizer.X = np.vstack((optimizer.X, X_batch))
+        optimizer.evaluate_objective()
+
+    return values[:budget]
+
+def run_trial_wrapper(args):
+    return _run_trial(*args)
+
+def _run_trial(config_name, seed, bds, target, budget, maximize):
+    """Runs a seeded optimisation trial
+
+    Args:
+        config_name: key of the optimiser configuration
+        seed: random seed of the trial
+        bds: GPyOpt-style domain of the replayed design points
+        target: a key value for the target function
+        budget: number of evaluations
+        maximize: flag to maximise the target
+
+    Returns:
+        config_name: key of the optimiser configuration
+        seed: random seed of the trial
+        values: target values in order of evaluation
+    """
+
+    random.seed(seed)
+    np.random.seed(seed)
+
+    config = _CONFIGS[config_name]
+    rng = np.random.RandomState(seed)
+
+    if config['optimiser'] == 'random':
+        values = _random_trial(_CANDIDATES, target, budget, rng)
+    else:
+        values = _bo_trial(bds, _CANDIDATES, target, budget, config, maximize, rng)
+
+    return config_name, seed, values
+
+def regret_curve(values, optimum, budget, maximize):
+    """Computes the simple regret after each evaluation
+
+    Args:
+        values: target values in order of evaluation
+        optimum: best recorded target value
+        budget: length of the curve, the last regret is repeated if the trial
+            stopped early
+        maximize: flag to maximise the target
+
+    Returns:
+        regret: a vector with the regret after each evaluation
+    """
+
+    values = np.asarray(values, dtype=np.float64)
+
+    if maximize:
+        best = np.maximum.accumulate(values)
+    else:
+        best = np.minimum.accumulate(values)
+
+    regret = np.abs(optimum - best)
+
+    return np.concatenate([regret, np.repeat(regret[-1:], budget - len(regret))])
+
+def _recorded_optimum(replay, target, maximize):
+    """Finds the best target value over the recorded design points"""
+
+    values = [gem5_results.get_target_value(dict(zip(replay.targets, y)), target)
+              for y in replay.predict(replay.designs())]
+
+    return max(values) if maximize else min(values)
+
+def write_to_file(file_name, curves):
+    """Writes regret curve statistics to a file
+
+    Args:
+        file_name: output file
+        curves: a dict mapping configuration keys to (trials, budget) matrices
+    """
+
+    with open(file_name, "w") as f:
+        f.write("config,evaluation,mean,median,q25,q75\n")
+
+        for config_name, regret in curves.items():
+            mean = regret.mean(axis=0)
+            q25, median, q75 = np.percentile(regret, [25, 50, 75], axis=0)
+
+            for i in range(regret.shape[1]):
+                f.write("{},{},{},{},{},{}\n".format(config_name, i + 1,
+                        mean[i], median[i], q25[i], q75[i]))
+
+if __name__ == "__main__":
+
+    # Setting up the argument parser
+    parser = argparse.ArgumentParser(description='Benchmark optimisers on replayed gem5-aladdin results')
+    parser.add_argument('--results_file', type=str, default=_DEFAULT_RESULTS_FILE,
+                        help='Recorded results to be replayed.')
+    parser.add_argument('--target', type=str, default=gem5_constants._CONST_CYCLE,
+                        choices=gem5_constants._CONST_TARGET_CHOICES,
+                        help='Target function, cycle/power/area are minimised, P1-P5 maximised.')
+    parser.add_argument('--configs', type=str, nargs='+', default=list(_CONFIGS.keys()),
+                        choices=list(_CONFIGS.keys()), help='Optimiser configurations.')
+    parser.add_argument('--trials', type=int, default=100, help='Number of seeded trials per configuration.')
+    parser.add_argument('--budget', type=int, default=50, help='Number of evaluations per trial.')
+    parser.add_argument('--workers', type=int, default=4, help='Number of workers in the pool.')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Synthetic latency in seconds of each evaluation.')
+    parser.add_argument('--regret_file', type=str, default=_DEFAULT_REGRET_FILE,
+                        help='Filename to save the regret curves.')
+
+    args = parser.parse_args()
+
+    maximize = args.target in gem5_constants._CONST_TARGET_CHOICES_TESTS
+
+    replay = gem5_replay.ReplaySimulator(args.results_file)
+    bds = replay.domain()
+
+    optimum = _recorded_optimum(replay, args.target, maximize)
+
+    print("Replayed parameters: {}".format(', '.join(replay.param_names)))
+    print("Recorded design points: {}".format(len(replay.designs())))
+    print("Best recorded {}: {}".format(args.target, optimum))
+
+    tasks = [(config_name, seed, bds, args.target, args.budget, maximize)
+             for config_name in args.configs for seed in range(args.trials)]
+
+    time_st = time.time()
+
+    pool = Pool(processes=args.workers, initializer=_init_worker,
+                initargs=(args.results_file, args.latency))
+
+    curves = dict((config_name, []) for config_name in args.configs)
+    for config_name, seed, values in pool.imap_unordered(run_trial_wrapper, tasks):
+        curves[config_name].append(regret_curve(values, optimum, args.budget, maximize))
+
+    pool.close()
+    pool.join()
+
+    curves = dict((config_name, np.array(c)) for config_name, c in curves.items())
+
+    write_to_file(args.regret_file, curves)
+
+    print("{} trials in {:.1f} s".format(len(tasks), time.time() - time_st))
+    for config_name, regret in curves.items():
+        print("{:>24} final regret mean={:.6g} median={:.6g}".format(
+            config_name, regret[:, -1].mean(), np.median(regret[:, -1])))
@@ -6,6 +6,8 @@ Based on: https://github.com/cambridge-mlg/gem5-aladdin/tree/master/bo_script
 
 import numpy as np
 import itertools
+import collections
+import functools
 from multiprocessing import Pool
 import time
 import sys
@@ -15,7 +17,13 @@ import random
 
 sys.path.append("./")
 
-from base import gem5_aladdin_interface as gem5
+from base import gem5_registry
+from base import gem5_workspace
+from base import gem5_pareto
+from base import gem5_stopping
+from base import gem5_screening
+from base import gem5_results
+from base import gem5_constants
 
 _CONST_TLB_ASSOC = 'tlb_assoc'
 _CONST_TLB_ENTRIES = 'tlb_entries'
@@ -79,19 +87,21 @@ _AVAILABLE_PARAMS = {
 
 _RESULTS_PARAMS = ['success','cycle', 'power', 'area']
 
-def _sampling(selected_params, samples, no_workers, benchmark, results_file="results.csv"):
-    """Performs sampling.
+# Retention of simulation outputs: full directories of the top-k designs, and
+#   a disk quota of the archive of parsed results and compressed outputs
+_KEEP_TOP_K = 0
+_KEEP_TOP_K_TARGET = gem5_constants._CONST_P1
+_ARCHIVE_QUOTA_BYTES = 50 * 1024 ** 3
 
-    Performs sampling over the given samples. The method utilizes a pool of
-        workers approach for parallelization.
+def _samples_to_params(selected_params, samples):
+    """Converts a matrix with parameter values to simulator parameters
 
     Args:
         selected_params: labels of the selected parameters
         samples: a matrix with parameter values
-        no_workers: a number of workers in the pool
-        benchmark: name of the bechmark from the Machsuite
-        results_file: output file
 
+    Returns:
+        samples_splits: a list of parameter dictionaries, one per sample
     """
 
     # check if _CONST_TLB_ASSOC and _CONST_TLB_ENTRIES are listed
@@ -120,23 +130,77 @@ def _sampling(selected_params, samples, no_workers, benchmark, results_file="res
 
         samples_splits.append(params)
 
+    return samples_splits
+
+def _sampling(selected_params, samples, no_workers, benchmark, results_file="results.csv",
+    archive=None, stopping=None):
+    """Performs sampling.
+
+    Performs sampling over the given samples. The method utilizes a pool of
+        workers approach for parallelization.
+
+    Args:
+        selected_params: labels of the selected parameters
+        samples: a matrix with parameter values
+        no_workers: a number of workers in the pool
+        benchmark: name of the bechmark from the Machsuite
+        results_file: output file
+        archive: Pareto archive to be updated, a new one by default
+        stopping: stopping rules evaluated after each result
+
+    Returns:
+        sampled: a list with the results of the simulated samples, in the order
+            of the samples
+        archive: Pareto archive of the successful results over cycle, power and area
+    """
+
+    samples_splits = _samples_to_params(selected_params, samples)
+
     pool = Pool(processes=no_workers)
 
-    results = pool.imap(process_sample_wrapper, zip(samples_splits, [benchmark] * len(samples_splits)))
+    if archive is None:
+        archive = gem5_pareto.ParetoArchive(gem5_constants._CONST_TARGET_CHOICES_SIMULATOR)
+
+    # at most no_workers samples are submitted at a time, so that stopping early
+    #   only waits for the simulations in flight instead of killing them
+    in_flight = collections.deque()
+    next_sample = 0
+    stopped = False
+
+    sampled = []
 
     result_cnt = 0
-    for result in results:
+    while in_flight or (not stopped and next_sample < len(samples_splits)):
+
+        while not stopped and next_sample < len(samples_splits) and len(in_flight) < no_workers:
+            in_flight.append(pool.apply_async(process_sample_wrapper,
+                ((samples_splits[next_sample], benchmark),)))
+            next_sample += 1
+
+        result = in_flight.popleft().get()
 
         if result_cnt > 0:
             write_to_file(results_file, result, selected_params)
         else:
             write_to_file(results_file, result, selected_params, add_head=True, overwrite=True)
 
+        sampled.append(result)
         result_cnt += 1
 
         print(result_cnt, result)
 
-    return
+        if result["success"] and archive.add(result, payload=result):
+            print("Pareto front updated, size: {}".format(len(archive)))
+
+        if not stopped and stopping is not None and stopping.update(result):
+            print("Stopping early: {}, waiting for {} running samples".format(
+                stopping.reason, len(in_flight)))
+            stopped = True
+
+    pool.close()
+    pool.join()
+
+    return sampled, archive
 
 def process_sample_wrapper(args):
     return _process_sample(*args)
@@ -159,7 +223,11 @@ def _process_sample(params, benchmark):
     time_st = time.time()
     try:
 
-        result = gem5.main(params, rm_sim_dir=True, bench_name=benchmark)
+        # duplicates across workers and drivers wait on the in-flight run
+        result = gem5_registry.main(params, rm_sim_dir=True, bench_name=benchmark,
+            sim_func=functools.partial(gem5_workspace.main, keep_top_k=_KEEP_TOP_K,
+                target=_KEEP_TOP_K_TARGET, maximize=True,
+                quota_bytes=_ARCHIVE_QUOTA_BYTES))
         params_cpy.update(result)
         params_cpy.update({"success":True})
 
@@ -233,7 +301,8 @@ def list_dict_values(res_dict, keyword_list):
     return value_str
 
 def _prep_and_run_samples(selected_params, results_file, benchmark,
-    randomise=True, no_of_random_samples=None, unique_saples=False):
+    randomise=True, no_of_random_samples=None, unique_saples=False, archive=None,
+    stopping=None):
 
     """Prepares and runs samples
 
@@ -244,6 +313,8 @@ def _prep_and_run_samples(selected_params, results_file, benchmark,
         randomise: a flag to randomise grid lines
         no_of_random_samples: a fixed number of samples to be evaluated
         unique_saples: enforce uniqueness of samples
+        archive: Pareto archive to be updated
+        stopping: stopping rules evaluated after each result
     """
 
     if no_of_random_samples is not None:
@@ -271,7 +342,67 @@ def _prep_and_run_samples(selected_params, results_file, benchmark,
     print("Total number of samples: {}".format(str(len(grid))))
 
     # performs random sampling
-    _sampling(selected_params, grid, NO_WORKERS, benchmark, results_file=results_file)
+    _sampling(selected_params, grid, NO_WORKERS, benchmark, results_file=results_file,
+        archive=archive, stopping=stopping)
+
+def _screening(selected_params, no_workers, benchmark, results_file, screening_file,
+    no_of_trajectories=10, target=gem5_constants._CONST_P1, maximize=None,
+    threshold=gem5_screening._DEFAULT_THRESHOLD):
+    """Screens parameters with Morris elementary effects
+
+    Simulates Morris trajectories in parallel over the pool of workers, ranks
+        the parameters and saves the ranking together with a reduced domain in
+        which insignificant parameters are fixed to their level in the best design.
+
+    Args:
+        selected_params: a list of parameters to be screened
+        no_workers: a number of workers in the pool
+        benchmark: name of the bechmark from the Machsuite
+        results_file: output file of the screening simulations
+        screening_file: output file of the ranking and the reduced domain
+        no_of_trajectories: number of Morris trajectories
+        target: a key value for the target function
+        maximize: flag to treat larger target values as better, by default set
+            for the P1-P5 targets
+        threshold: relative mu* below which a parameter is fixed
+
+    Returns:
+        ranking: parameter ranking, most influential first
+    """
+
+    if maximize is None:
+        maximize = target in gem5_constants._CONST_TARGET_CHOICES_TESTS
+
+    param_levels = [list(_AVAILABLE_PARAMS[p]) for p in selected_params]
+
+    grid, moved, steps = gem5_screening.morris_design(param_levels, no_of_trajectories)
+
+    print("Total number of screening samples: {}".format(str(len(grid))))
+
+    sampled, _ = _sampling(selected_params, grid, no_workers, benchmark, results_file=results_file)
+
+    values = np.array([gem5_results.get_target_value(result, target) if result["success"] else np.nan
+                       for result in sampled])
+
+    if not np.any(np.isfinite(values)):
+        raise ValueError('All screening simulations failed')
+
+    mu_star, mu, sigma = gem5_screening.morris_effects(values, moved, steps)
+    ranking = gem5_screening.rank_parameters(selected_params, mu_star, mu, sigma)
+
+    best_idx = np.nanargmax(values) if maximize else np.nanargmin(values)
+    best_params = dict(zip(selected_params, grid[best_idx]))
+
+    reduced = gem5_screening.reduce_domain(dict(zip(selected_params, param_levels)),
+        ranking, best_params, threshold=threshold)
+
+    gem5_screening.save_screening(screening_file, ranking, reduced, target, maximize)
+
+    for r in ranking:
+        print("{:>28} mu*={:.6g} relative={:.3f}".format(r['parameter'], r['mu_star'],
+            r['relative_mu_star']))
+
+    return ranking
 
 def list_parameters(values_list):
 
@@ -290,9 +421,25 @@ if __name__ == "__main__":
     NO_WORKERS = 1
 
     single_param_mode = False
+    screening_mode = False
     no_of_random_samples = 10
     unique_saples = True
 
+    # stopping rules: hypervolume plateau over cycle, power and area, and a
+    #   budget of simulation hours per benchmark; the plateau can only be
+    #   detected if hv_patience is below the number of samples
+    hv_patience = 5
+    sim_hours_budget = 24
+
+    # Morris screening: parameters whose relative mu* on the screening target
+    #   is below the threshold are fixed in the reduced domain. The target and
+    #   direction must be those of the optimiser using the reduced domain, i.e.
+    #   P1 maximised as in gpy_example.py
+    no_of_trajectories = 10
+    screening_target = gem5_constants._CONST_P1
+    screening_maximize = True
+    screening_threshold = 0.1
+
     # The list of Machsuite benchmarks
     # benchmark_list = ["aes_aes", "bfs_bulk", "bfs_queue", "fft_strided",
     #     "fft_transpose", "gemm_blocked", "gemm_ncubed", "kmp_kmp", "md_grid",
@@ -313,7 +460,14 @@ if __name__ == "__main__":
 
         def_results_file = benchmark.strip() + "_results.csv"
 
-        if single_param_mode:
+        if screening_mode:
+
+            _screening(list(_AVAILABLE_PARAMS.keys()), NO_WORKERS, benchmark,
+                "screening_" + def_results_file, benchmark.strip() + "_screening.json",
+                no_of_trajectories=no_of_trajectories, target=screening_target,
+                maximize=screening_maximize, threshold=screening_threshold)
+
+        elif single_param_mode:
 
             for avail_param_key in _AVAILABLE_PARAMS.keys():
 
@@ -326,7 +480,13 @@ if __name__ == "__main__":
             # TODO: this is not the correct place to list parameters
             selected_params = list(_AVAILABLE_PARAMS.keys())
 
+            archive = gem5_pareto.ParetoArchive(gem5_constants._CONST_TARGET_CHOICES_SIMULATOR)
+            stopping = gem5_stopping.StoppingRules([
+                gem5_stopping.HypervolumePlateau(archive, hv_patience),
+                gem5_stopping.Budget(sim_time=sim_hours_budget * 3600)])
+
             _prep_and_run_samples(selected_params, def_results_file, benchmark,
-                    no_of_random_samples=no_of_random_samples, unique_saples=unique_saples)
+                    no_of_random_samples=no_of_random_samples, unique_saples=unique_saples,
+                    archive=archive, stopping=stopping)
 
     print("Finished.")